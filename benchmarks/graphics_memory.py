@@ -0,0 +1,58 @@
+"""Measures the memory used per GraphicsObject and the time it takes to read and write attributes and move.
+Run it from the root of the repo: python benchmarks/graphics_memory.py
+Running it on an older revision gives the numbers to compare against."""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graphics as g
+
+NUM_OBJECTS = 5000
+
+
+def measure(name, create):
+    win = g.Window(320, 240)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [create(win, i) for i in range(NUM_OBJECTS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    start = time.perf_counter()
+    for obj in objects:
+        obj.x
+    read = time.perf_counter() - start
+
+    # A direct write is not tracked, so it is timed with the markChanged call that makes it tracked
+    start = time.perf_counter()
+    for obj in objects:
+        obj.x = obj.x + 1
+        obj.markChanged()
+    update = time.perf_counter() - start
+
+    move = float("nan")   # Text has no move
+    if hasattr(objects[0], "move"):
+        start = time.perf_counter()
+        for obj in objects:
+            obj.move(1, 1)
+        move = time.perf_counter() - start
+
+    print(f"{name:<10} {size / NUM_OBJECTS:>10.1f} bytes/object {read / NUM_OBJECTS * 1e9:>8.1f} ns/read "
+          f"{update / NUM_OBJECTS * 1e9:>8.1f} ns/update {move / NUM_OBJECTS * 1e9:>8.1f} ns/move")
+
+
+def main():
+    measure("Point", lambda win, i: g.Point(i, i, win))
+    measure("Circle", lambda win, i: g.Circle(i, i, 10, win))
+    measure("Rectangle", lambda win, i: g.Rectangle(i, i, 10, 10, win))
+    measure("Ellipse", lambda win, i: g.Ellipse(i, i, 10, 10, win))
+    measure("Text", lambda win, i: g.Text(i, i, win))
+
+
+if __name__ == '__main__':
+    main()
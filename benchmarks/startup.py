@@ -0,0 +1,41 @@
+"""Measures how long the launcher takes to show its first frame, and how long until every game icon
+has been streamed into the menu. Run it from the root of the repo: python benchmarks/startup.py"""
+import os
+import sys
+import time
+
+start = time.perf_counter()
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(root)
+sys.path.insert(0, root)
+
+
+def main():
+    import main as launcher
+    import menu
+    imported = time.perf_counter()
+
+    launcher.capture_enabled = False
+    launcher.initialize()
+    initialized = time.perf_counter()
+
+    # The first update shows the empty screen, the second is the first frame with the menu on it
+    launcher.update()
+    launcher.update()
+    first_frame = time.perf_counter()
+
+    while len(menu.pending_icons) > 0:
+        launcher.update()
+    icons_loaded = time.perf_counter()
+
+    print(f"import        {(imported - start) * 1000:8.1f} ms")
+    print(f"initialize    {(initialized - start) * 1000:8.1f} ms")
+    print(f"first frame   {(first_frame - start) * 1000:8.1f} ms")
+    print(f"icons loaded  {(icons_loaded - start) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Packs a game folder into a single .arcade file so launching it does not open and decode hundreds of loose files.
+
+A bundle is a zip archive holding the game's code, info.txt, icon.png and the rest of its assets with the same
+paths they have in the game folder. Code is imported straight from the archive with zipimport. Assets are stored
+uncompressed (they are already compressed images and sounds) so they are read from a memory map of the archive,
+and graphics decodes them into its shared image cache the first time a game asks for them.
+
+Games keep loading their assets with the same paths as before (games/<name>/...), the bundle is registered with
+graphics as the source for everything under that folder.
+
+To build a bundle from the root of the repo:
+    python bundle.py games/example_game
+"""
+
+import mmap
+import os
+import struct
+import sys
+import types
+import zipimport
+from io import BytesIO
+
+import graphics as g
+
+BUNDLE_EXTENSION = ".arcade"
+GAMES_FOLDER = "games"
+REQUIRED_FILES = ("icon.png", "info.txt")
+COMPRESSED_EXTENSIONS = (".py", ".txt", ".json", ".csv")   # Everything else is stored so it can be mapped
+
+INVALID_BUNDLE = "Bundle is missing the game's code, icon.png or info.txt: "
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+
+bundles: dict[str, "Bundle"] = {}
+
+
+class BundleError(Exception):
+    """Base class for errors in the bundle module."""
+    pass
+
+
+class Bundle:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)[:-len(BUNDLE_EXTENSION)]
+        self.folder = GAMES_FOLDER + "/" + self.name + "/"
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.assets = {}   # name in the bundle -> (start of the data, size, True if stored uncompressed)
+        self.importer = None
+
+        import zipfile   # Imported here so a launcher without bundles never pays for it
+        with zipfile.ZipFile(self.file) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                header = LOCAL_HEADER.unpack_from(self.data, info.header_offset)
+                if header[0] != b"PK\x03\x04":
+                    raise BundleError("Corrupt bundle " + path + ": bad header for " + info.filename)
+                start = info.header_offset + LOCAL_HEADER.size + header[9] + header[10]
+                self.assets[info.filename] = (start, info.compress_size, info.compress_type == zipfile.ZIP_STORED)
+
+    def is_valid(self) -> bool:
+        return all(name in self.assets for name in REQUIRED_FILES) and self.name + ".py" in self.assets
+
+    def has(self, name: str) -> bool:
+        return name in self.assets
+
+    def read(self, name: str):
+        """Returns the contents of a file in the bundle. Stored files are a memoryview of the memory map, so
+        nothing is copied until the data is decoded."""
+        entry = self.assets.get(name)
+        if entry is None:
+            raise BundleError(name + " is not in bundle " + self.path)
+        start, size, stored = entry
+        if stored:
+            return memoryview(self.data)[start:start + size]
+        import zipfile
+        with zipfile.ZipFile(self.file) as archive:
+            return archive.read(name)
+
+    def open(self, name: str):
+        """Returns a file object for a file in the bundle, or None if it is not in it."""
+        if name not in self.assets:
+            return None
+        return BytesIO(self.read(name))
+
+    def read_text(self, name: str) -> str:
+        return bytes(self.read(name)).decode("utf-8")
+
+    def create_module(self, module_name: str) -> types.ModuleType:
+        """Makes an empty module for the game's code, like a loader's create_module."""
+        if self.importer is None:
+            self.importer = zipimport.zipimporter(self.path)
+        module = types.ModuleType(module_name)
+        module.__file__ = self.path + "/" + self.name + ".py"
+        module.__loader__ = self.importer
+        return module
+
+    def exec_module(self, module: types.ModuleType):
+        """Runs the game's code in module. The bundle is put on sys.path so the game can import its own
+        modules from it."""
+        if self.path not in sys.path:
+            sys.path.insert(0, self.path)
+        exec(self.importer.get_code(self.name), module.__dict__)
+
+    def _closeFile(self):
+        self.data.close()
+        self.file.close()
+
+    def close(self):
+        g.removeAssetSource(self.folder)
+        self._closeFile()
+
+
+def open_bundle(path: str) -> Bundle:
+    """Opens a bundle, registers it as the source of its game's assets and returns it. A bundle that is
+    missing the game's code, icon.png or info.txt is closed again and BundleError is raised."""
+    game_bundle = Bundle(path)
+    if not game_bundle.is_valid():
+        game_bundle._closeFile()
+        raise BundleError(INVALID_BUNDLE + path)
+    if game_bundle.name in bundles:
+        bundles[game_bundle.name].close()
+    bundles[game_bundle.name] = game_bundle
+    g.addAssetSource(game_bundle.folder, game_bundle.open)
+    return game_bundle
+
+
+def get_bundle(name: str):
+    """Returns the bundle of a game, opening it if needed, or None if the game is not bundled or its bundle
+    is not valid."""
+    if name in bundles:
+        return bundles[name]
+    path = GAMES_FOLDER + "/" + name + BUNDLE_EXTENSION
+    if os.path.exists(path):
+        try:
+            return open_bundle(path)
+        except BundleError:
+            return None
+    return None
+
+
+def build(folder: str, output: str = None) -> str:
+    """Packs a game folder into a bundle next to it and returns the path of the bundle."""
+    import zipfile
+    folder = os.path.normpath(folder)
+    name = os.path.basename(folder)
+    if output is None:
+        output = folder + BUNDLE_EXTENSION
+    for required in REQUIRED_FILES + (name + ".py",):
+        if not os.path.exists(os.path.join(folder, required)):
+            raise BundleError(folder + " is missing " + required)
+
+    temp = output + ".tmp"
+    with zipfile.ZipFile(temp, "w") as archive:
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for file in sorted(files):
+                if file.endswith((".pyc", ".pyo")):
+                    continue
+                path = os.path.join(root, file)
+                name_in_bundle = os.path.relpath(path, folder).replace(os.sep, "/")
+                compress_type = zipfile.ZIP_DEFLATED if file.endswith(COMPRESSED_EXTENSIONS) else zipfile.ZIP_STORED
+                archive.write(path, name_in_bundle, compress_type=compress_type)
+    os.replace(temp, output)
+    return output
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python bundle.py games/<name> [games/<name> ...]")
+        sys.exit(1)
+    for game_folder in sys.argv[1:]:
+        print("Built " + build(game_folder))
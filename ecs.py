@@ -0,0 +1,269 @@
+"""An entity component system for games with lots of things on screen. Instead of one Python object per
+sprite every component is a column in a NumPy array indexed by entity id, so a system can update every
+matching entity with a few array operations instead of a Python loop.
+
+Example:
+    world = ecs.World()
+    world.defineComponent("position", shape=(2,))
+    world.defineComponent("velocity", shape=(2,))
+    bridge = ecs.RenderBridge(world, win)
+    ball = bridge.addSprite("games/my_game/ball.png")
+    world.createEntities(10000, position=(960, 540), velocity=np.random.uniform(-100, 100, (10000, 2)), sprite=ball)
+
+    def move(world, ids, frame_time):
+        world.get("position")[ids] += world.get("velocity")[ids] * frame_time
+
+    world.addSystem(move, "position", "velocity")
+    ...
+    world.update(frame_time)   # every frame in update()
+"""
+
+import numpy as np
+
+import graphics
+
+
+# Errors Messages to be used
+# =================================================================================================
+UNKNOWN_COMPONENT = "Component has not been defined: "
+DUPLICATE_COMPONENT = "Component has already been defined: "
+TOO_MANY_COMPONENTS = "A World can only have 64 components."
+DEAD_ENTITY = "Entity does not exist: "
+
+
+# Helper Classes
+# =================================================================================================
+class ECSError(Exception):
+    """Base class for errors in the ecs module."""
+    pass
+
+
+# ECS Classes
+# =================================================================================================
+class World:
+    MAX_COMPONENTS = 64
+
+    def __init__(self, capacity=1024):
+        """Creates an empty World with room for capacity entities. It grows when more are created."""
+        graphics.invalidValueCheck(capacity)
+        self.capacity = int(capacity)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.masks = np.zeros(self.capacity, dtype=np.uint64)   # Bit i is set if the entity has component i
+        self.nextId = 0
+        self.freeIds = []   # Ids of destroyed entities that get reused first
+        self.components = {}   # Component name -> array with one row per entity
+        self.componentBits = {}   # Component name -> bit in masks
+        self.defaults = {}   # Component name -> value of rows without the component
+        self.systems = []   # (function, component names) run in order by update
+        self.structureVersion = 0   # Goes up every time an entity or component is added or removed
+        self.queryCache = {}   # Component mask -> (structureVersion, ids)
+
+    def defineComponent(self, name, dtype=np.float32, shape=(), default=0):
+        """Adds a component type. shape is the shape of one entity's value, like (2,) for a position."""
+        if name in self.components:
+            raise ECSError(DUPLICATE_COMPONENT + name)
+        if len(self.components) >= self.MAX_COMPONENTS:
+            raise ECSError(TOO_MANY_COMPONENTS)
+        self.componentBits[name] = np.uint64(1 << len(self.componentBits))
+        self.components[name] = np.full((self.capacity,) + tuple(shape), default, dtype=dtype)
+        self.defaults[name] = default
+
+    def hasComponentType(self, name):
+        """Checks to see if a component type has been defined"""
+        return name in self.components
+
+    def _bit(self, name):
+        bit = self.componentBits.get(name)
+        if bit is None:
+            raise ECSError(UNKNOWN_COMPONENT + str(name))
+        return bit
+
+    def _mask(self, names):
+        mask = np.uint64(0)
+        for name in names:
+            mask |= self._bit(name)
+        return mask
+
+    def _grow(self, needed):
+        """Makes every array big enough for needed entities. Columns are new arrays afterwards, so games
+        should get them with get() every frame instead of keeping them around."""
+        capacity = max(self.capacity * 2, needed)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.capacity] = self.alive
+        masks = np.zeros(capacity, dtype=np.uint64)
+        masks[:self.capacity] = self.masks
+        for name, column in self.components.items():
+            grown = np.full((capacity,) + column.shape[1:], self.defaults[name], dtype=column.dtype)
+            grown[:self.capacity] = column
+            self.components[name] = grown
+        self.alive = alive
+        self.masks = masks
+        self.capacity = capacity
+
+    def createEntities(self, count, **components):
+        """Creates count entities and returns their ids as an array. Each keyword sets a component to a value
+        that is broadcast to every new entity, or to one row per entity."""
+        graphics.invalidValueCheck(count)
+        count = int(count)
+        bits = {name: self._bit(name) for name in components}   # Raises before any ids are taken
+        reused = self.freeIds[len(self.freeIds) - min(count, len(self.freeIds)):]
+        del self.freeIds[len(self.freeIds) - len(reused):]
+        new = count - len(reused)
+        ids = np.concatenate((np.array(reused, dtype=np.int64), np.arange(self.nextId, self.nextId + new, dtype=np.int64)))
+        self.nextId += new
+        if self.nextId > self.capacity:
+            self._grow(self.nextId)
+
+        self.alive[ids] = True
+        self.masks[ids] = 0
+        try:
+            for name, value in components.items():
+                self.components[name][ids] = value
+                self.masks[ids] |= bits[name]
+        except Exception:
+            # A value did not fit its component, so give the ids back instead of losing them
+            self.destroyEntities(ids)
+            raise
+        self.structureVersion += 1
+        return ids
+
+    def createEntity(self, **components):
+        """Creates a single entity and returns its id."""
+        return int(self.createEntities(1, **components)[0])
+
+    def destroyEntities(self, ids):
+        """Destroys the entities. Their ids are reused by the next entities created."""
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        ids = np.unique(ids[self.alive[ids]])
+        if len(ids) == 0:
+            return
+        self.alive[ids] = False
+        self.masks[ids] = 0
+        for name, column in self.components.items():
+            column[ids] = self.defaults[name]
+        self.freeIds.extend(ids.tolist())
+        self.structureVersion += 1
+
+    def destroyEntity(self, entity):
+        """Destroys a single entity."""
+        self.destroyEntities([entity])
+
+    def isAlive(self, entity):
+        """Checks to see if the entity exists"""
+        return 0 <= entity < self.capacity and bool(self.alive[entity])
+
+    def _checkAlive(self, ids):
+        """Returns ids as an array, raising if any of them is not an entity that exists. A dead id that got a
+        component would show up in queries while it is still waiting to be reused."""
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        valid = (ids >= 0) & (ids < self.capacity)
+        valid[valid] = self.alive[ids[valid]]
+        if not valid.all():
+            raise ECSError(DEAD_ENTITY + str(ids[~valid].tolist()))
+        return ids
+
+    def addComponent(self, ids, name, value=None):
+        """Gives the entities a component, set to value or the default of the component."""
+        ids = self._checkAlive(ids)
+        bit = self._bit(name)
+        self.components[name][ids] = self.defaults[name] if value is None else value
+        self.masks[ids] |= bit
+        self.structureVersion += 1
+
+    def removeComponent(self, ids, name):
+        """Takes a component away from the entities."""
+        ids = self._checkAlive(ids)
+        bit = self._bit(name)
+        self.masks[ids] &= ~bit
+        self.components[name][ids] = self.defaults[name]
+        self.structureVersion += 1
+
+    def hasComponent(self, entity, name):
+        """Checks to see if the entity has the component"""
+        bit = self._bit(name)
+        return self.isAlive(entity) and bool(self.masks[entity] & bit)
+
+    def get(self, name):
+        """Returns the whole column of a component. Index it with the ids from query to read or write it."""
+        column = self.components.get(name)
+        if column is None:
+            raise ECSError(UNKNOWN_COMPONENT + str(name))
+        return column
+
+    def query(self, *names):
+        """Returns an array of the ids of every entity that has all the components. The result is cached
+        until an entity or component is added or removed, so calling it every frame is cheap."""
+        mask = self._mask(names)
+        cached = self.queryCache.get(mask)
+        if cached is not None and cached[0] == self.structureVersion:
+            return cached[1]
+        if mask:
+            ids = np.flatnonzero((self.masks & mask) == mask)
+        else:
+            ids = np.flatnonzero(self.alive)
+        self.queryCache[mask] = (self.structureVersion, ids)
+        return ids
+
+    def count(self, *names):
+        """Returns how many entities have all the components"""
+        return len(self.query(*names))
+
+    def addSystem(self, system, *names):
+        """Adds a function called by update as system(world, ids, frame_time) with the ids of every entity
+        that has all the components."""
+        self._mask(names)
+        self.systems.append((system, names))
+
+    def removeSystem(self, system):
+        """Removes a function added with addSystem"""
+        self.systems = [entry for entry in self.systems if entry[0] is not system]
+
+    def update(self, frameTime):
+        """Runs every system once in the order they were added."""
+        for system, names in self.systems:
+            system(self, self.query(*names), frameTime)
+
+
+class RenderBridge(graphics.GraphicsObject):
+    """Draws every entity that has a position and a sprite component with a single Surface.blits call.
+    Positions are the centers of the sprites and the sprite component is an index returned by addSprite.
+    The components are defined on the World if it does not have them yet."""
+    __slots__ = ("world", "positionComponent", "spriteComponent", "sprites", "offsets")
+
+    def __init__(self, world, window, positionComponent="position", spriteComponent="sprite"):
+        super().__init__(window)
+        self.world = world
+        self.positionComponent = positionComponent
+        self.spriteComponent = spriteComponent
+        if not world.hasComponentType(positionComponent):
+            world.defineComponent(positionComponent, shape=(2,))
+        if not world.hasComponentType(spriteComponent):
+            world.defineComponent(spriteComponent, dtype=np.int32)
+        self.sprites = np.empty(0, dtype=object)
+        self.offsets = np.zeros((0, 2), dtype=np.float32)   # Half the size of each sprite
+
+    def addSprite(self, sprite):
+        """Adds a sprite and returns the index to store in the sprite component. sprite can be a file path,
+        a pygame Surface or a graphics.Image (hide the Image so it is not drawn twice)."""
+        if isinstance(sprite, str):
+            surface = graphics.loadImageFile(sprite).convert_alpha()
+        elif isinstance(sprite, graphics.Image):
+            surface = sprite.image
+        else:
+            surface = sprite
+        sprites = np.empty(len(self.sprites) + 1, dtype=object)
+        sprites[:-1] = self.sprites
+        sprites[-1] = surface
+        self.sprites = sprites
+        self.offsets = np.vstack((self.offsets, np.array(surface.get_size(), dtype=np.float32) / 2))
+        self._version += 1
+        return len(self.sprites) - 1
+
+    def draw(self):
+        """Draws every entity with a position and a sprite"""
+        ids = self.world.query(self.positionComponent, self.spriteComponent)
+        if len(ids) == 0:
+            return
+        spriteIds = self.world.get(self.spriteComponent)[ids]
+        positions = (self.world.get(self.positionComponent)[ids] - self.offsets[spriteIds]).astype(np.int32)
+        self.window.screen.blits(zip(self.sprites[spriteIds].tolist(), positions.tolist()), doreturn=False)
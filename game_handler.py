@@ -1,9 +1,17 @@
 import importlib.util
+import os
 import sys
+import types
 import traceback
 import gc
+import time
+import threading
+import ctypes
+from collections import deque
 import graphics as g
 import import_this
+import bundle
+import storage
 
 debug_mode = True
 error_occurred = False
@@ -12,17 +20,168 @@ game = None
 game_name = "No game"
 win: g.Window = None
 
-modules = {}
 graphics_objects = []
+event_listeners = {}   # The window's listeners before the game loaded, so the game's own are removed with it
+window_effects = []   # The window's effects before the game loaded
+path = []
+game_paths = ()   # Absolute folders (with a trailing separator) that the running game's modules live in
+
+# Hot reload
+# While hot_reload is on the files of the running game's modules are checked for changes every
+# reload_check_interval seconds and changed modules are run again in place. Top level variables the game
+# has changed since they were set keep their value, everything else (functions, classes, constants that
+# were edited) comes from the new code. A game can define on_reload() to fix up anything else.
+hot_reload = debug_mode
+reload_check_interval = 0.5
+next_reload_check = 0.0
+watched_files = {}   # Module name -> (path, modification time)
+module_defaults = {}   # Module name -> {variable name: value the module's code gave it}
+scanned_module_count = 0   # Size of sys.modules the last time it was scanned for game modules
+
+# Frame budget accounting
+# frame_budget is how long a game's update() may take in seconds. What happens when a game keeps going
+# over it depends on overrun_policy:
+#   "log"     - print a warning
+#   "overlay" - print a warning and show it on screen while the game is slow
+#   "unload"  - unload the game and go back to the menu
+# Overruns count as sustained after sustained_overruns frames in a row go over budget.
+VALID_POLICIES = ("log", "overlay", "unload")
+frame_budget = 1 / 30
+overrun_policy = "overlay"
+sustained_overruns = 30
+frame_history = 300
+
+frame_times = deque(maxlen=frame_history)
+overrun_count = 0
+consecutive_overruns = 0
+overlay_text: g.Text = None
+
+# Watchdog
+# A background thread that breaks out of an update() that has been running for longer than hang_timeout
+# seconds by raising GameHangError in the main thread. This only works while the game is running Python
+# code, so a game stuck inside a C call (like time.sleep) is only stopped once that call returns.
+# GameHangError is a BaseException so "except Exception" in a game does not catch it, and if the game
+# still swallows it (with a bare except) it is raised again every hang_retry_interval seconds.
+hang_timeout = 5.0
+hang_retry_interval = 1.0
+watchdog_thread: threading.Thread = None
+watchdog_lock = threading.Lock()
+main_thread_id = threading.main_thread().ident
+update_started = None
+watchdog_fired = False
+watchdog_fired_at = 0.0
+
+
+class GameHangError(BaseException):
+    """Raised in the main thread by the watchdog when a game's update() never returns."""
+
+    def __init__(self, *args):
+        super().__init__(*(args or ("update() did not return within " + str(hang_timeout) + " seconds",)))
+
+class GameTooSlowError(Exception):
+    """Raised when a game goes over its frame budget for too long and the policy is to unload it."""
+    pass
+
+def is_game_module(name: str, module) -> bool:
+    """Checks if a module belongs to the running game. Only these are torn down when it unloads, so shared
+    libraries the game imported (like numpy) stay loaded for the next launch."""
+    if name == "game":
+        return True
+    file = getattr(module, "__file__", None)
+    if file is None:
+        return False
+    return os.path.abspath(file).startswith(game_paths)
 
 def clear_modules():
+    global scanned_module_count
+
     win.objects = graphics_objects
-    for i in sys.modules.copy():
-        if i not in modules:
-            sys.modules[i].__dict__.clear()
-            sys.modules.pop(i)
+    win.listeners = event_listeners
+    win.effects = window_effects
+    sys.path[:] = path
+    g.clearImageCache("games/" + game_name + "/")
+    for name, module in list(sys.modules.items()):
+        if is_game_module(name, module):
+            module.__dict__.clear()
+            sys.modules.pop(name)
+    watched_files.clear()
+    module_defaults.clear()
+    scanned_module_count = 0
     gc.collect()
 
+def is_state(value) -> bool:
+    return not isinstance(value, (types.FunctionType, types.ModuleType, type))
+
+def get_defaults(module) -> dict:
+    return {name: value for name, value in module.__dict__.items() if not name.startswith("__") and is_state(value)}
+
+def is_default(value, default) -> bool:
+    if value is default:
+        return True
+    try:
+        return bool(type(value) == type(default) and value == default)
+    except Exception:
+        return False
+
+def watch_game_modules():
+    """Starts watching the files of game modules that are not watched yet."""
+    global scanned_module_count
+
+    if len(sys.modules) == scanned_module_count:
+        return
+    scanned_module_count = len(sys.modules)
+    for name, module in list(sys.modules.items()):
+        if name not in watched_files and is_game_module(name, module):
+            file = getattr(module, "__file__", None)
+            if file is not None and os.path.isfile(file):
+                watched_files[name] = (file, os.stat(file).st_mtime_ns)
+                module_defaults.setdefault(name, get_defaults(module))
+
+def reload_module(name: str, file: str):
+    module = sys.modules[name]
+    with open(file, "r") as source:
+        # compiled before anything is touched so a syntax error leaves the running game alone
+        code = compile(source.read(), file, "exec")
+
+    old = get_defaults(module)
+    exec(code, module.__dict__)
+    new_defaults = get_defaults(module)
+
+    defaults = module_defaults.get(name, {})
+    for variable, value in old.items():
+        if variable in new_defaults and variable in defaults and not is_default(value, defaults[variable]):
+            module.__dict__[variable] = value
+    module_defaults[name] = new_defaults
+
+    if debug_mode:
+        print("Reloaded " + name + " (" + file + ")")
+
+def check_for_changes():
+    global next_reload_check
+
+    now = time.perf_counter()
+    if now < next_reload_check:
+        return
+    next_reload_check = now + reload_check_interval
+
+    watch_game_modules()
+    for name, (file, modified) in list(watched_files.items()):
+        try:
+            current = os.stat(file).st_mtime_ns
+        except OSError:
+            continue
+        if current == modified:
+            continue
+        watched_files[name] = (file, current)
+        try:
+            reload_module(name, file)
+            if name == "game" and hasattr(game, "on_reload"):
+                game.on_reload()
+        except Exception:
+            if debug_mode:
+                print("Reload of " + name + " failed:")
+                traceback.print_exc()
+
 def handle_game_error(e):
     global game, error_occurred, game_name
 
@@ -52,28 +211,160 @@ def handle_game_error(e):
     game_name = "No game"
 
 
+def watchdog():
+    global watchdog_fired, watchdog_fired_at
+
+    while True:
+        time.sleep(min(0.1, hang_timeout / 10))
+        with watchdog_lock:
+            now = time.perf_counter()
+            if update_started is None or now - update_started <= hang_timeout:
+                continue
+            if not watchdog_fired or now - watchdog_fired_at > hang_retry_interval:
+                watchdog_fired = True
+                watchdog_fired_at = now
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(main_thread_id),
+                                                           ctypes.py_object(GameHangError))
+
+
+def start_watchdog():
+    global watchdog_thread
+
+    if watchdog_thread is None:
+        watchdog_thread = threading.Thread(target=watchdog, name="GameWatchdog", daemon=True)
+        watchdog_thread.start()
+
+
+def percentile(values, fraction):
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def get_frame_stats():
+    """Returns the p50 and p99 update times in seconds and the number of budget overruns of the current game."""
+    return {
+        "p50": percentile(frame_times, 0.5),
+        "p99": percentile(frame_times, 0.99),
+        "overruns": overrun_count
+    }
+
+
+def reset_frame_stats():
+    global frame_times, overrun_count, consecutive_overruns, overlay_text
+
+    frame_times = deque(maxlen=frame_history)
+    overrun_count = 0
+    consecutive_overruns = 0
+    overlay_text = None
+
+
+def show_overlay(visible: bool):
+    global overlay_text
+
+    if overlay_text is None:
+        if not visible:
+            return
+        overlay_text = g.Text(20, 1000, win, fontSize=48, color=(255, 64, 64))
+    if visible:
+        stats = get_frame_stats()
+        overlay_text.setText(game_name.strip() + " is running slow: p99 " + str(round(stats["p99"] * 1000, 1)) + " ms")
+        # keep the warning on top of everything the game has drawn
+        win.removeObject(overlay_text)
+        win.addObject(overlay_text)
+    overlay_text.setVisibility(visible)
+
+
+def record_frame_time(duration: float):
+    global overrun_count, consecutive_overruns
+
+    frame_times.append(duration)
+
+    if duration <= frame_budget:
+        if consecutive_overruns >= sustained_overruns and overrun_policy == "overlay":
+            show_overlay(False)
+        consecutive_overruns = 0
+        return
+
+    overrun_count += 1
+    consecutive_overruns += 1
+
+    if consecutive_overruns % sustained_overruns != 0:
+        return
+
+    if debug_mode:
+        stats = get_frame_stats()
+        print("WARNING (" + game_name.strip() + "): over the frame budget for " + str(consecutive_overruns) +
+              " frames, p50 " + str(round(stats["p50"] * 1000, 1)) + " ms, p99 " + str(round(stats["p99"] * 1000, 1)) + " ms")
+
+    if overrun_policy == "overlay":
+        show_overlay(True)
+    elif overrun_policy == "unload":
+        raise GameTooSlowError("over the frame budget of " + str(round(frame_budget * 1000, 1)) +
+                               " ms for " + str(consecutive_overruns) + " frames")
+
+
+def handle_listener_error(event_type, listener, e):
+    """Called by the window when a listener raises. Listeners the game added go through the game's error path,
+    the launcher's own are removed by the window."""
+    if game is not None and listener not in event_listeners.get(event_type, ()):
+        handle_game_error(e)
+    else:
+        win.reportListenerError(event_type, listener, e)
+
+
 def should_close():
     return error_occurred or game_closed
 
 
 def load(new_game_name: str):
-    global game, game_name, error_occurred, game_closed, modules, graphics_objects
+    global game, game_name, error_occurred, game_closed, graphics_objects, event_listeners, window_effects, path, \
+        game_paths, scanned_module_count
+
+    if overrun_policy not in VALID_POLICIES:
+        raise ValueError("overrun_policy must be one of " + ", ".join(VALID_POLICIES) + ", not " + repr(overrun_policy))
 
     try:
         import_this.win = win
+        import_this.store = storage.open_store(new_game_name)
 
         game_name = new_game_name
         error_occurred = False
         game_closed = False
 
         graphics_objects = win.objects.copy()
+        event_listeners = {event_type: listeners.copy() for event_type, listeners in win.listeners.items()}
+        win.listenerErrorHandler = handle_listener_error
+        window_effects = win.effects.copy()
+
+        reset_frame_stats()
+        start_watchdog()
 
-        modules = sys.modules.copy()
+        path = sys.path.copy()
+        game_paths = (os.path.abspath("games/" + new_game_name) + os.sep,
+                      os.path.abspath("games/" + new_game_name + bundle.BUNDLE_EXTENSION) + os.sep)
+        watched_files.clear()
+        module_defaults.clear()
+        scanned_module_count = 0
 
-        spec = importlib.util.spec_from_file_location("game", "games/" + new_game_name + "/" + new_game_name + ".py")
-        game = importlib.util.module_from_spec(spec)
-        sys.modules["game"] = game
-        spec.loader.exec_module(game)
+        game_bundle = bundle.get_bundle(new_game_name)
+        if game_bundle is not None:
+            game = game_bundle.create_module("game")
+            sys.modules["game"] = game
+            game_bundle.exec_module(game)
+        else:
+            spec = importlib.util.spec_from_file_location("game", "games/" + new_game_name + "/" + new_game_name + ".py")
+            game = importlib.util.module_from_spec(spec)
+            sys.modules["game"] = game
+            spec.loader.exec_module(game)
+
+        # What the game's code set its variables to, before load() changes any of them
+        module_defaults["game"] = get_defaults(game)
+
+        # Small images the game lists in atlas_images are packed into atlas pages before it makes any Images.
+        # Entries are paths of images loaded without transparency or (path, transparent) pairs.
+        g.buildAtlas(getattr(game, "atlas_images", ()))
 
         game.load()
     except Exception as e:
@@ -97,13 +388,35 @@ def unload():
             handle_game_error(e)
 
 def update():
-    global game_closed
+    global game_closed, update_started, watchdog_fired
+
+    if hot_reload:
+        check_for_changes()
 
     try:
+        start = time.perf_counter()
+        with watchdog_lock:
+            update_started = start
+            watchdog_fired = False
+
         if game.should_close():
             game_closed = True
         else:
             game.update()
 
-    except Exception as e:
+        with watchdog_lock:
+            update_started = None
+            if watchdog_fired:
+                # the update finished right as the watchdog fired, so cancel the pending GameHangError
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(main_thread_id), None)
+
+        if not game_closed:
+            record_frame_time(time.perf_counter() - start)
+
+    except (Exception, GameHangError) as e:
+        with watchdog_lock:
+            update_started = None
+            if watchdog_fired and not isinstance(e, GameHangError):
+                # the game failed on its own right as the watchdog fired, so cancel the pending GameHangError
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(main_thread_id), None)
         handle_game_error(e)
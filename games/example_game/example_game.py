@@ -2,6 +2,8 @@ from import_this import *
 
 image = None
 
+atlas_images = ["games/example_game/icon.png"]
+
 def load():
     global image
     image = graphics.Image(500, 800, win, "games/example_game/icon.png")
@@ -1,10 +1,29 @@
 import pygame
 import math
 import os
+import contextlib
+import struct
+import threading
+import time
+import traceback
+import zlib
 
 # Initialize Pygame
 # =================================================================================================
-pygame.init()
+"""pygame.init() starts every subsystem (mixer, joystick, font, ...) which is slow and mostly unused
+before the first frame. Instead each subsystem is started the first time something needs it.
+The timer subsystem is never started, so pygame.time.get_ticks() always returns 0. Use Window.elapsedTime,
+window.clock.get_time() or time.perf_counter() to measure time instead."""
+def _initFont():
+    """Starts the font module the first time text is used."""
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+
+def _initMixer():
+    """Starts the mixer the first time a sound is loaded."""
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
 
 
 # Global Variables
@@ -39,9 +58,35 @@ KEY_MAP = {
     "backspace": pygame.K_BACKSPACE
 }
 
+# Mouse buttons that can be clicked
+BUTTON_MAP = {
+    "LEFT": 1,
+    "MIDDLE": 2,
+    "RIGHT": 3
+}
+
+# Event types that are let through to the event queue. Anything else is dropped by SDL before it
+# ever reaches Python. Use Window.allowEvents or Window.addListener to let more through.
+ALLOWED_EVENTS = [
+    pygame.QUIT,
+    pygame.KEYDOWN,
+    pygame.KEYUP,
+    pygame.MOUSEBUTTONDOWN,
+    pygame.MOUSEBUTTONUP,
+    pygame.VIDEORESIZE,
+    pygame.WINDOWRESIZED
+]
+
 # Modes and Options used
 # =================================================================================================
 VALID_MODES = ("CENTER", "CORNER")
+VALID_PIXEL_KINDS = ("rgb", "alpha", "raw")
+VALID_CAPTURE_FORMATS = ("png", "raw")
+GLYPH_ATLAS_CACHE_SIZE = 16   # Most recently used GlyphAtlases kept for Text drawn with useAtlas
+TRANSFORM_CACHE_SIZE = 4   # Most recently used transformed surfaces (and collision masks) kept per Image
+ATLAS_PAGE_SIZE = 2048   # Width and height of the surfaces small images are packed into
+MAX_ATLAS_SPRITE = 256   # Images bigger than this in either direction keep their own surface
+ATLAS_PADDING = 1
 
 
 # Errors Messages to be used
@@ -51,6 +96,10 @@ INVALID_COLOR_OPTION = "Color must be an rgb tuple"
 INVALID_MODE = "Mode must be CENTER or CORNER."
 INVALID_BOOL = "Value must be a boolean (True or False)."
 INVALID_POLYGON_POINTS = "Points must be entered as a list of tuples. Ex-[(1, 2), (3, 4), ...]"
+INVALID_PIXEL_KIND = "Pixel kind must be rgb, alpha or raw."
+INVALID_FADE_AMOUNT = "Fade amount must be between 0 and 1."
+INVALID_CAPTURE_FORMAT = "Capture format must be png or raw."
+INVALID_FRAME_SIZE = "The sprite sheet must be at least one frame wide and tall."
 
 
 # Helper Classes
@@ -74,6 +123,249 @@ def invalidValueCheck(*args, zero=False):
             raise GraphicsError("Value must be greater than 0.")
 
 
+# Asset Functions
+# =================================================================================================
+"""Images are decoded once per file into a shared cache and every Image converts its own copy. Asset sources
+let files under a folder come from somewhere other than the disk, like a game's bundle."""
+_imageCache = {}   # File path -> decoded Surface
+_assetSources = {}   # Folder prefix -> function that returns a file object for a path inside it, or None
+
+def _normalizePath(file):
+    return file.replace("\\", "/")
+
+
+def addAssetSource(prefix, opener):
+    """Makes files whose path starts with prefix get opened by opener(path after the prefix)."""
+    _assetSources[_normalizePath(prefix)] = opener
+
+
+def removeAssetSource(prefix):
+    """Removes a source added with addAssetSource"""
+    _assetSources.pop(_normalizePath(prefix), None)
+
+
+def openAsset(file):
+    """Returns a file object for file from its asset source, or the path itself if no source has it."""
+    if not isinstance(file, str):
+        return file
+    path = _normalizePath(file)
+    for prefix, opener in _assetSources.items():
+        if path.startswith(prefix):
+            opened = opener(path[len(prefix):])
+            if opened is not None:
+                return opened
+    return file
+
+
+def loadImageFile(file):
+    """Returns the decoded Surface of an image file from the shared cache, decoding it the first time.
+    The Surface is shared, so copy or convert it before changing it."""
+    surface = _imageCache.get(file)
+    if surface is None:
+        surface = pygame.image.load(openAsset(file), _normalizePath(file))
+        _imageCache[file] = surface
+    return surface
+
+
+def clearImageCache(prefix=""):
+    """Removes every cached image and atlas region whose path starts with prefix (all of them by default)."""
+    prefix = _normalizePath(prefix)
+    for file in list(_imageCache):
+        if _normalizePath(file).startswith(prefix):
+            del _imageCache[file]
+    for key in list(_atlasRegions):
+        if _normalizePath(key[0]).startswith(prefix):
+            del _atlasRegions[key]
+
+
+# Texture Atlas Functions
+# =================================================================================================
+"""Lots of small images each with their own surface waste memory and blit slowly. buildAtlas packs them into a
+few big display format surfaces (pages), and every Image made from one of those files afterwards uses a
+subsurface of its page, which shares the page's pixels instead of copying them. Images with and without
+transparency need different pixel formats, so they are packed into separate pages."""
+_atlasRegions = {}   # (file path, transparent) -> subsurface of an atlas page
+
+def _packShelves(sizes, pageSize):
+    """Packs (width, height) sizes into pages using shelves, tallest first. Returns the (page, x, y) of every
+    size in the order given and the (width, height) each page needs."""
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    placements = [None] * len(sizes)
+    pages = []   # [used height, [[shelf y, shelf height, next free x], ...]]
+    for i in order:
+        width = sizes[i][0] + ATLAS_PADDING
+        height = sizes[i][1] + ATLAS_PADDING
+        for p in range(len(pages) + 1):
+            if p == len(pages):
+                pages.append([0, []])
+            usedHeight, shelves = pages[p]
+            shelf = next((shelf for shelf in shelves if height <= shelf[1] and shelf[2] + width <= pageSize), None)
+            if shelf is None and usedHeight + height <= pageSize:
+                shelf = [usedHeight, height, 0]
+                shelves.append(shelf)
+                pages[p][0] += height
+            if shelf is not None:
+                placements[i] = (p, shelf[2], shelf[0])
+                shelf[2] += width
+                break
+
+    pageSizes = [(max(shelf[2] for shelf in shelves), usedHeight) for usedHeight, shelves in pages]
+    return placements, pageSizes
+
+
+def buildAtlas(files, transparent=False):
+    """Packs the images in files that are at most MAX_ATLAS_SPRITE pixels wide and tall into atlas pages.
+    Images made from these files afterwards draw from the atlas if they use the same transparent setting.
+    An entry of files can also be a (file, transparent) pair. Returns the number of pages made."""
+    groups = {False: {}, True: {}}   # transparent -> {file: surface}
+    for entry in files:
+        file, entryTransparent = entry if isinstance(entry, tuple) else (entry, transparent)
+        entryTransparent = bool(entryTransparent)
+        if (file, entryTransparent) in _atlasRegions or file in groups[entryTransparent]:
+            continue
+        surface = loadImageFile(file)
+        if surface.get_width() <= MAX_ATLAS_SPRITE and surface.get_height() <= MAX_ATLAS_SPRITE:
+            groups[entryTransparent][file] = surface
+    return sum(_buildPages(surfaces, groupTransparent) for groupTransparent, surfaces in groups.items() if surfaces)
+
+
+def _buildPages(surfaces, transparent):
+    """Packs the {file: surface} into pages with per pixel alpha if transparent, or opaque ones like
+    Surface.convert makes if not. Returns the number of pages made."""
+    converting = pygame.display.get_surface() is not None
+    sizes = [surface.get_size() for surface in surfaces.values()]
+    placements, pageSizes = _packShelves(sizes, ATLAS_PAGE_SIZE)
+    pages = []
+    for size in pageSizes:
+        if transparent:
+            page = pygame.Surface(size, pygame.SRCALPHA)
+            pages.append(page.convert_alpha() if converting else page)
+        else:
+            page = pygame.Surface(size)
+            pages.append(page.convert() if converting else page)
+
+    for (file, surface), (p, x, y) in zip(surfaces.items(), placements):
+        if transparent:
+            source = surface.convert_alpha() if converting else surface
+            # Pages start fully transparent, so taking the max copies the image exactly
+            pages[p].blit(source, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            source = surface.convert() if converting else surface
+            pages[p].blit(source, (x, y))
+        _atlasRegions[(file, transparent)] = pages[p].subsurface((x, y) + surface.get_size())
+    return len(pages)
+
+
+def getAtlasRegion(file, transparent=False):
+    """Returns the atlas subsurface of file for the transparent setting, or None if it is not in an atlas."""
+    return _atlasRegions.get((file, bool(transparent)))
+
+
+# Pixel Helper Functions
+# =================================================================================================
+"""These work on whole surfaces at once through NumPy arrays that point straight at the pixels of the
+surface, so nothing gets copied. The surface is locked until the array is garbage collected, and a locked
+surface can not be drawn. Games get a live array through _editPixels, which only hands it to a function and
+drops it before returning, or a copy from _editedPixels that is written back when their with block ends."""
+@contextlib.contextmanager
+def _lockedPixels(surface, kind="rgb"):
+    """Yields a NumPy array that shares memory with the surface. Indexed as [x, y] like surfarray."""
+    if kind not in VALID_PIXEL_KINDS:
+        raise GraphicsError(INVALID_PIXEL_KIND)
+    if kind == "rgb":
+        array = pygame.surfarray.pixels3d(surface)
+    elif kind == "alpha":
+        array = pygame.surfarray.pixels_alpha(surface)
+    else:
+        array = pygame.surfarray.pixels2d(surface)
+    try:
+        yield array
+    finally:
+        del array
+
+
+def _editPixels(surface, function, kind="rgb"):
+    """Calls function with a NumPy array that shares memory with the surface and returns what it returns. No
+    name outside this call holds the array, so the surface is unlocked again as soon as it returns (unless
+    function kept the array somewhere)."""
+    with _lockedPixels(surface, kind) as pixels:
+        return function(pixels)
+
+
+@contextlib.contextmanager
+def _editedPixels(surface, kind="rgb"):
+    """Yields a NumPy copy of the pixels of the surface and writes it back when the with block ends. The name
+    given to the array in the with statement outlives the block, so a live array would keep the surface locked."""
+    if kind not in VALID_PIXEL_KINDS:
+        raise GraphicsError(INVALID_PIXEL_KIND)
+    if kind == "rgb":
+        array = pygame.surfarray.array3d(surface)
+    elif kind == "alpha":
+        array = pygame.surfarray.array_alpha(surface)
+    else:
+        array = pygame.surfarray.array2d(surface)
+    yield array
+    with _lockedPixels(surface, kind) as pixels:
+        pixels[...] = array
+
+
+@contextlib.contextmanager
+def _lockedBuffer(surface):
+    """Yields a flat memoryview of the raw bytes of the surface, including any padding at the end of each row."""
+    view = memoryview(surface.get_view("0"))
+    try:
+        yield view
+    finally:
+        view.release()
+
+
+def _toRGB(color):
+    """Turns a color name or tuple into an (r, g, b) tuple."""
+    if isinstance(color, str):
+        return COLOR_MAP.get(color.upper(), (0, 0, 0))
+    return tuple(color[:3])
+
+
+def _packRGB(pixels):
+    """Packs an [x, y, 3] array of colors into one 24 bit integer per pixel."""
+    import numpy as np
+    return (pixels[..., 0].astype(np.uint32) << 16) | (pixels[..., 1].astype(np.uint32) << 8) | pixels[..., 2]
+
+
+def _colorHistogram(surface, rect=None):
+    """Counts how many pixels of each color are in rect (the whole surface if rect is None)."""
+    import numpy as np
+    area = surface.get_rect() if rect is None else pygame.Rect(rect).clip(surface.get_rect())
+    with _lockedPixels(surface) as pixels:
+        packed = _packRGB(pixels[area.left:area.right, area.top:area.bottom])
+    colors, counts = np.unique(packed, return_counts=True)
+    return {(c >> 16, (c >> 8) & 255, c & 255): n for c, n in zip(colors.tolist(), counts.tolist())}
+
+
+def _swapPalette(surface, palette):
+    """Replaces every pixel whose color is a key of palette with the matching value. Every mask is made
+    from the original colors so swaps never chain into each other."""
+    with _lockedPixels(surface) as pixels:
+        packed = _packRGB(pixels)
+        masks = []
+        for old, new in palette.items():
+            r, g, b = _toRGB(old)
+            masks.append((packed == ((r << 16) | (g << 8) | b), _toRGB(new)))
+        for mask, new in masks:
+            pixels[mask] = new
+
+
+def _fade(surface, amount, color):
+    """Blends every pixel of the surface towards color. An amount of 0 does nothing and 1 fills it."""
+    import numpy as np
+    invalidValueCheck(amount, zero=True)
+    if amount > 1:
+        raise GraphicsError(INVALID_FADE_AMOUNT)
+    with _lockedPixels(surface) as pixels:
+        blended = pixels * (1.0 - amount)
+        blended += np.asarray(_toRGB(color), dtype=np.float64) * amount
+        pixels[...] = blended.astype(np.uint8)
+
 
 # Sound/Music Classes
 # =================================================================================================
@@ -84,8 +376,9 @@ class Sound:
     def __init__(self, file, loop=0):
         """Creates a sound object. Loops is how many times the sound plays.
         -1 means the sound loops indefinitely."""
+        _initMixer()
         self.loop = loop
-        self.sound = pygame.mixer.Sound(file)
+        self.sound = pygame.mixer.Sound(openAsset(file))
 
     def play(self):
         self.sound.play(self.loop)
@@ -99,12 +392,231 @@ class Music(Sound):
         super().__init__(file, loop)
 
 
+# Text Classes
+# =================================================================================================
+"""Rendering a string with a font rasterizes every character of it again, which is wasted work for text
+that changes every frame like scores, timers and FPS counters. A GlyphAtlas renders each character of
+one font size and color once into a single surface, so drawing a string is one Surface.blits call."""
+class GlyphAtlas:
+    ATLAS_WIDTH = 1024
+    DEFAULT_CHARACTERS = "".join(chr(i) for i in range(32, 127))
+
+    def __init__(self, fontSize, color):
+        invalidValueCheck(fontSize)
+        _initFont()
+        self.fontSize = fontSize
+        self.color = color
+        self.font = pygame.font.Font(None, fontSize)
+        self.height = self.font.get_height()
+        self.surface = None
+        self.glyphs = {}   # Character -> (rect of the glyph in the atlas, advance)
+        self.kerning = {}   # (first, second) -> extra space between the two characters
+        self._build(self.DEFAULT_CHARACTERS)
+
+    def _build(self, characters):
+        """Renders every character and packs the glyphs into rows of a new atlas surface."""
+        rendered = [(character, self.font.render(character, True, self.color))
+                    for character in dict.fromkeys(characters)]
+        rowHeight = max(glyph.get_height() for character, glyph in rendered)
+        x = y = 0
+        placed = []
+        for character, glyph in rendered:
+            if x + glyph.get_width() > self.ATLAS_WIDTH:
+                x = 0
+                y += rowHeight
+            placed.append((character, glyph, x, y))
+            x += glyph.get_width()
+
+        surface = pygame.Surface((self.ATLAS_WIDTH, y + rowHeight), pygame.SRCALPHA)
+        glyphs = {}
+        for character, glyph, x, y in placed:
+            # The atlas starts fully transparent, so taking the max copies the glyph exactly
+            surface.blit(glyph, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+            glyphs[character] = (pygame.Rect(x, y, glyph.get_width(), glyph.get_height()), glyph.get_width())
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        self.surface = surface
+        self.glyphs = glyphs
+
+    def _addMissing(self, string):
+        """Rebuilds the atlas if the string has characters that are not in it yet."""
+        for character in string:
+            if character not in self.glyphs:
+                self._build("".join(self.glyphs) + string)
+                return
+
+    def _kern(self, first, second):
+        """Returns the extra space the font puts between two characters. Measured once per pair."""
+        pair = first + second
+        kerning = self.kerning.get(pair)
+        if kerning is None:
+            kerning = self.font.size(pair)[0] - self.glyphs[first][1] - self.glyphs[second][1]
+            self.kerning[pair] = kerning
+        return kerning
+
+    def layout(self, string, x, y):
+        """Returns the list of (atlas, position, area) tuples that draw the string with its top-left
+        corner at (x, y), and the x position right after the last character."""
+        self._addMissing(string)
+        glyphs = self.glyphs
+        blits = []
+        previous = None
+        for character in string:
+            rect, advance = glyphs[character]
+            if previous is not None:
+                x += self._kern(previous, character)
+            blits.append((self.surface, (x, y), rect))
+            x += advance
+            previous = character
+        return blits, x
+
+    def getWidth(self, string):
+        """Returns the width of the string when drawn from the atlas."""
+        return self.layout(string, 0, 0)[1]
+
+    def draw(self, surface, string, x, y):
+        """Draws the string onto surface with its top-left corner at (x, y)."""
+        surface.blits(self.layout(string, x, y)[0], doreturn=False)
+
+
+_glyphAtlases = {}   # (font size, color) -> GlyphAtlas, least recently used first
+
+def getGlyphAtlas(fontSize, color):
+    """Returns the shared GlyphAtlas for a font size and color, creating it the first time it is asked for.
+    Only the GLYPH_ATLAS_CACHE_SIZE most recently used are kept, so text whose color is tweened does not
+    keep a font and an atlas for every color it passed through."""
+    key = (fontSize, color if isinstance(color, str) else tuple(color))
+    atlas = _glyphAtlases.pop(key, None)
+    if atlas is None:
+        if len(_glyphAtlases) >= GLYPH_ATLAS_CACHE_SIZE:
+            del _glyphAtlases[next(iter(_glyphAtlases))]
+        atlas = GlyphAtlas(fontSize, color)
+    # Put it back at the end so it is the most recently used
+    _glyphAtlases[key] = atlas
+    return atlas
+
+
+# Capture Classes
+# =================================================================================================
+"""Saving a frame on the main thread takes far longer than a frame, so the FrameRecorder only copies
+each presented frame into a ring of surfaces that are reused once they have been made. Worker threads do
+the encoding.
+If the workers fall behind the frame is dropped and counted instead of making the game wait."""
+class FrameRecorder:
+    RAW_HEADER = struct.Struct("<4sHH")
+
+    def __init__(self, window, folder="captures", seconds=5, fps=30, scale=0.25, fileFormat="png", workers=2):
+        """Creates a recorder that keeps the last seconds of frames in memory at fps frames per second.
+        Frames are shrunk by scale and encoded as either a png or zlib compressed raw RGB."""
+        invalidValueCheck(seconds, fps, scale, workers)
+        if fileFormat not in VALID_CAPTURE_FORMATS:
+            raise GraphicsError(INVALID_CAPTURE_FORMAT)
+        self.window = window
+        self.folder = folder
+        self.fileFormat = fileFormat
+        self.interval = 1000 / fps
+        self.size = (max(1, int(window.width * scale)), max(1, int(window.height * scale)))
+        numFrames = max(1, int(seconds * fps))
+        self.frames = [None] * numFrames   # Surfaces are made the first time their slot is used
+        self.frameTimes = [0] * numFrames
+        self.busy = [False] * numFrames
+        self.index = 0   # Slot the next frame is copied into
+        self.count = 0   # Number of slots holding a frame
+        self.frameNumber = 0
+        self.nextCaptureTime = 0
+        self.recording = False
+        self.recordingFolder = folder
+        self.droppedFrames = 0
+        self.savedFrames = 0
+        self.lock = threading.Lock()
+        from concurrent.futures import ThreadPoolExecutor   # Only needed once capture is turned on
+        self.pool = ThreadPoolExecutor(max_workers=int(workers), thread_name_prefix="FrameRecorder")
+
+    def capture(self, now):
+        """Copies the screen into the ring. Called by the Window right after a frame is shown."""
+        if now < self.nextCaptureTime:
+            return
+        self.nextCaptureTime = max(self.nextCaptureTime + self.interval, now)
+        slot = self.index
+        if self.busy[slot]:
+            self.droppedFrames += 1
+            return
+        if self.frames[slot] is None:
+            self.frames[slot] = pygame.Surface(self.size)
+        if self.size == self.window.screen.get_size():
+            self.frames[slot].blit(self.window.screen, (0, 0))
+        else:
+            pygame.transform.scale(self.window.screen, self.size, self.frames[slot])
+        self.frameTimes[slot] = now
+        self.index = (slot + 1) % len(self.frames)
+        self.count = min(self.count + 1, len(self.frames))
+        self.frameNumber += 1
+        if self.recording:
+            self._submit(slot, self.recordingFolder, self.frameNumber)
+
+    def start(self):
+        """Starts writing every captured frame to disk in a new folder."""
+        if not self.recording:
+            self.recordingFolder = os.path.join(self.folder, time.strftime("recording_%Y%m%d_%H%M%S"))
+        self.recording = True
+
+    def stop(self):
+        """Stops writing frames to disk. The last seconds are still kept in memory."""
+        self.recording = False
+
+    def saveLast(self, seconds=None):
+        """Writes the frames from the last seconds (all that are held if None) to a new folder.
+        Returns the number of frames that were queued to be written."""
+        if self.count == 0:
+            return 0
+        newest = self.frameTimes[(self.index - 1) % len(self.frames)]
+        clipFolder = os.path.join(self.folder, time.strftime("clip_%Y%m%d_%H%M%S"))
+        queued = 0
+        for i in range(self.count):
+            slot = (self.index - self.count + i) % len(self.frames)
+            if seconds is not None and newest - self.frameTimes[slot] > seconds * 1000:
+                continue
+            if self.busy[slot]:
+                self.droppedFrames += 1
+                continue
+            queued += 1
+            self._submit(slot, clipFolder, queued)
+        return queued
+
+    def close(self):
+        """Waits for every queued frame to be written and stops the worker threads."""
+        self.recording = False
+        self.pool.shutdown(wait=True)
+
+    def _submit(self, slot, folder, number):
+        self.busy[slot] = True
+        self.pool.submit(self._encode, slot, folder, number)
+
+    def _encode(self, slot, folder, number):
+        """Runs on a worker thread. The slot is marked busy so the main thread never writes into it."""
+        try:
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"frame_{number:06d}.{self.fileFormat}")
+            surface = self.frames[slot]
+            if self.fileFormat == "png":
+                pygame.image.save(surface, path)
+            else:
+                data = zlib.compress(pygame.image.tobytes(surface, "RGB"), 1)
+                with open(path, "wb") as file:
+                    file.write(self.RAW_HEADER.pack(b"BCAF", *self.size))
+                    file.write(data)
+            with self.lock:
+                self.savedFrames += 1
+        finally:
+            self.busy[slot] = False
+
+
 # Graphics Classes
 # =================================================================================================
 class Window:
     def __init__(self, width, height, title="Graphics Window"):
-        pygame.init()
         invalidValueCheck(width, height)
+        pygame.display.init()
         self.width = width
         self.height = height
         self.title = title
@@ -112,12 +624,28 @@ class Window:
         pygame.display.set_caption(title)
         self.running = True
         self.clock = pygame.time.Clock()
-        self.__startTime = pygame.time.get_ticks()
+        # pygame.time.get_ticks() reads 0 unless pygame.init() started the timer subsystem
+        self.__startTime = time.perf_counter()
         self.elapsedTime = 0
         self.events = []   # List of events for event handling
         self.objects = []   # List of objects to be drawn on the screen
         self.keys_pressed = set()
+        # Events of this frame sorted by type, filled in one pass by _dispatchEvents
+        self.keysDown = set()   # Keys that went down this frame
+        self.keysUp = set()   # Keys that went up this frame
+        self.mouseDown = {}   # Button -> position of buttons that went down this frame
+        self.mouseUp = {}   # Button -> position of buttons that went up this frame
+        self.quitRequested = False
+        self.resizedTo = None   # New size of the window if it was resized this frame
+        self.listeners = {}   # Event type -> list of functions called with each event of that type
+        # Function called with (event type, listener, exception) when a listener raises. When None the error is
+        # printed and the listener removed, so one broken listener can not stop the window from updating.
+        self.listenerErrorHandler = None
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(ALLOWED_EVENTS)
         self.backgroundColor = (255, 255, 255)
+        self.effects = []   # Functions run on the finished frame before it is shown
+        self.recorder = None   # FrameRecorder used to capture frames, None when capture is off
         # self.EDGES = []
 
     def setBackground(self, color):
@@ -143,44 +671,124 @@ class Window:
         for obj in self.objects:
             if obj.getVisibility():
                 obj.draw()
+        for effect in self.effects:
+            effect(self)
         pygame.display.flip()
+        if self.recorder is not None:
+            self.recorder.capture(int((time.perf_counter() - self.__startTime) * 1000))
         self.clock.tick()
         self.events = pygame.event.get()
-        self._updateKeys()
+        self._dispatchEvents()
         self._updateRunningTime()
         pygame.display.update()
         self.close()
 
-    def _updateKeys(self):
-        """Internal method that grabs all keys that are being used by the user"""
+    def _dispatchEvents(self):
+        """Internal method that sorts the events of this frame by type in a single pass and calls any
+        listeners, so every query afterwards is a set or dict lookup."""
+        self.keysDown = set()
+        self.keysUp = set()
+        self.mouseDown = {}
+        self.mouseUp = {}
+        self.resizedTo = None
         for event in self.events:
-            if event.type == pygame.KEYDOWN:
+            eventType = event.type
+            if eventType == pygame.KEYDOWN:
                 self.keys_pressed.add(event.key)
-            elif event.type == pygame.KEYUP:
+                self.keysDown.add(event.key)
+            elif eventType == pygame.KEYUP:
                 self.keys_pressed.discard(event.key)
-
-    def isKeyPressed(self, key):
-        """Checks to see if key is being pressed"""
+                self.keysUp.add(event.key)
+            elif eventType == pygame.MOUSEBUTTONDOWN:
+                self.mouseDown[event.button] = event.pos
+            elif eventType == pygame.MOUSEBUTTONUP:
+                self.mouseUp[event.button] = event.pos
+            elif eventType == pygame.QUIT:
+                self.quitRequested = True
+            elif eventType == pygame.VIDEORESIZE:
+                self.resizedTo = event.size
+            if eventType in self.listeners:
+                self._callListeners(event)
+
+    def _callListeners(self, event):
+        """Internal method that calls every listener of the event's type."""
+        # Looked up for every event since a listener can add or remove listeners
+        listeners = self.listeners.get(event.type)
+        if not listeners:
+            return
+        for listener in tuple(listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                if self.listenerErrorHandler is None:
+                    self.reportListenerError(event.type, listener, e)
+                else:
+                    self.listenerErrorHandler(event.type, listener, e)
+
+    def handleEvents(self, events):
+        """Adds events taken off the queue between updates (like by a low latency input poll) to this frame's
+        events and calls their listeners, so nothing listening for them misses them."""
+        for event in events:
+            self.events.append(event)
+            if event.type in self.listeners:
+                self._callListeners(event)
+
+    def allowEvents(self, *eventTypes):
+        """Lets events of the given pygame types through to the event queue."""
+        pygame.event.set_allowed(list(eventTypes))
+
+    def addListener(self, eventType, listener):
+        """Adds a function that is called with every event of eventType when the events are handled each frame."""
+        self.allowEvents(eventType)
+        self.listeners.setdefault(eventType, []).append(listener)
+
+    def removeListener(self, eventType, listener):
+        """Removes a function added with addListener"""
+        if listener in self.listeners.get(eventType, ()):
+            self.listeners[eventType].remove(listener)
+
+    def reportListenerError(self, eventType, listener, error):
+        """Prints the error a listener raised and removes the listener."""
+        print("ERROR (listener " + getattr(listener, "__qualname__", repr(listener)) + "): " + str(error))
+        traceback.print_exception(type(error), error, error.__traceback__)
+        self.removeListener(eventType, listener)
+
+    def _keyCode(self, key):
+        """Internal method that turns a key name into a pygame key code"""
         if isinstance(key, str):
             key = key.lower()
             if len(key) == 1:
-                keyCode = ord(key)
-            else:
-                keyCode = KEY_MAP.get(key)
-            return keyCode in self.keys_pressed
-        return key in self.keys_pressed
+                return ord(key)
+            return KEY_MAP.get(key)
+        return key
+
+    def isKeyPressed(self, key):
+        """Checks to see if key is being pressed"""
+        return self._keyCode(key) in self.keys_pressed
+
+    def isKeyFirstPressed(self, key):
+        """Checks to see if key went down this frame"""
+        return self._keyCode(key) in self.keysDown
+
+    def isKeyReleased(self, key):
+        """Checks to see if key went up this frame"""
+        return self._keyCode(key) in self.keysUp
 
     def isMouseClicked(self, button):
         """Checks to see if button is being clicked by the user"""
-        button_map = {
-            "LEFT": 1,
-            "MIDDLE": 2,
-            "RIGHT": 3
-        }
-        for event in self.events:
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == button_map.get(button.upper(), 0):
-                return True
-        return False
+        return BUTTON_MAP.get(button.upper(), 0) in self.mouseDown
+
+    def isMouseReleased(self, button):
+        """Checks to see if button was released this frame"""
+        return BUTTON_MAP.get(button.upper(), 0) in self.mouseUp
+
+    def getClickPosition(self, button):
+        """Returns the position the button was clicked at this frame, or None if it was not clicked"""
+        return self.mouseDown.get(BUTTON_MAP.get(button.upper(), 0))
+
+    def wasResized(self):
+        """Returns the new (width, height) if the window was resized this frame, otherwise None"""
+        return self.resizedTo
 
     def getMousePosition(self):
         """Returns the position of the mouse"""
@@ -190,6 +798,46 @@ class Window:
         """Returns the RGB value of the pixel at position (x,y)"""
         return self.screen.get_at((x, y))[:3]
 
+    def pixels(self, kind="rgb"):
+        """Used in a with block to get a NumPy array of the pixels of the screen, indexed as [x, y].
+        kind is rgb for an [x, y, 3] array, alpha for an [x, y] array or raw for the mapped integers.
+        Changes to the array are written to the screen when the with block ends. The array is a copy, which
+        takes longer than a frame for the whole screen, so use editPixels for anything done every frame."""
+        return _editedPixels(self.screen, kind)
+
+    def editPixels(self, function, kind="rgb"):
+        """Calls function with a NumPy array that points straight at the pixels of the screen, so nothing is
+        copied, and returns what function returns. The screen is locked while the array exists, so function
+        must not keep the array or return it. kind works the same as in pixels."""
+        return _editPixels(self.screen, function, kind)
+
+    def pixelBuffer(self):
+        """Used in a with block to get a memoryview of the raw bytes of the screen. The memoryview can not be
+        used after the with block ends."""
+        return _lockedBuffer(self.screen)
+
+    def getColorHistogram(self, x=0, y=0, width=None, height=None):
+        """Returns a dict of how many pixels of each RGB color are in the given region of the last frame."""
+        return _colorHistogram(self.screen, (x, y, width or self.width, height or self.height))
+
+    def addEffect(self, effect):
+        """Adds a function that is called with the Window after all objects are drawn and before the frame
+        is shown. Useful for swapPalette and fade which change the whole screen."""
+        self.effects.append(effect)
+
+    def removeEffect(self, effect):
+        """Removes a function added with addEffect"""
+        if effect in self.effects:
+            self.effects.remove(effect)
+
+    def swapPalette(self, palette):
+        """Replaces every color that is a key of palette with its value on the whole screen."""
+        _swapPalette(self.screen, palette)
+
+    def fade(self, amount, color="BLACK"):
+        """Blends the whole screen towards color by amount, which is between 0 and 1."""
+        _fade(self.screen, amount, color)
+
     def getWidth(self):
         """Returns the width of the window"""
         return self.width
@@ -198,18 +846,68 @@ class Window:
         """Returns the height of the window"""
         return self.height
 
+    def enableCapture(self, folder="captures", seconds=5, fps=30, scale=0.25, fileFormat="png", workers=2):
+        """Starts keeping the last seconds of frames in memory so they can be saved with saveCapture.
+        See FrameRecorder for what the options do."""
+        self.disableCapture()
+        self.recorder = FrameRecorder(self, folder, seconds, fps, scale, fileFormat, workers)
+
+    def isCaptureEnabled(self):
+        """Checks to see if frames are being kept in memory"""
+        return self.recorder is not None
+
+    def disableCapture(self):
+        """Stops capturing frames and waits for the ones already queued to be written."""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def startCapture(self):
+        """Starts writing every captured frame to disk. Enables capture with the defaults if needed."""
+        if self.recorder is None:
+            self.enableCapture()
+        self.recorder.start()
+
+    def stopCapture(self):
+        """Stops writing captured frames to disk."""
+        if self.recorder is not None:
+            self.recorder.stop()
+
+    def isCapturing(self):
+        """Checks to see if every frame is being written to disk"""
+        return self.recorder is not None and self.recorder.recording
+
+    def saveCapture(self, seconds=None):
+        """Writes the last seconds of frames to disk and returns how many frames were queued."""
+        if self.recorder is None:
+            return 0
+        return self.recorder.saveLast(seconds)
+
+    def getDroppedFrames(self):
+        """Returns how many frames were dropped because encoding fell behind."""
+        if self.recorder is None:
+            return 0
+        return self.recorder.droppedFrames
+
     def close(self):
         """Checks to see if the user wants to close the Window"""
-        for event in self.events:
-            if event.type == pygame.QUIT:
-                self.running = False
-                pygame.quit()
+        if self.quitRequested:
+            self.running = False
+            self.disableCapture()
+            pygame.quit()
 
     def _updateRunningTime(self):
-        self.elapsedTime = (pygame.time.get_ticks() - self.__startTime) // 1000
+        self.elapsedTime = int(time.perf_counter() - self.__startTime)
 
 class GraphicsObject:
+    """Base class of everything that can be drawn on a Window. Objects use __slots__ to keep them small.
+    Attributes are plain slots so reading and writing them stays fast. Only the set, move and transform methods
+    bump the version of the object. Writing an attribute directly (obj.x = 5) is NOT tracked, so getVersion
+    and hasChangedSince do not see it unless markChanged is called afterwards."""
+    __slots__ = ("window", "_version", "visible", "color", "outlineWidth", "outlineColor")
+
     def __init__(self, window, color=(255, 255, 255), visible=True, outlineWidth=1, outlineColor="BLACK"):
+        self._version = 0
         self.window = window
         self.visible = visible
         self.color = color
@@ -217,6 +915,18 @@ class GraphicsObject:
         self.outlineColor = outlineColor
         self.window.addObject(self)
 
+    def getVersion(self):
+        """Gets the version of a GraphicsObject. The version goes up every time the object is changed."""
+        return self._version
+
+    def hasChangedSince(self, version):
+        """Checks to see if the GraphicsObject has changed since it was at the version passed."""
+        return self._version != version
+
+    def markChanged(self):
+        """Bumps the version of a GraphicsObject. Needed after setting an attribute like x directly."""
+        self._version += 1
+
     def getVisibility(self):
         """Gets the visibility of a GraphicsObject"""
         return self.visible
@@ -227,22 +937,28 @@ class GraphicsObject:
         if not isinstance(boolean, bool):
             raise GraphicsError(INVALID_BOOL)
         self.visible = boolean
+        self._version += 1
 
     def setFill(self, color):
         """Sets the fill for a GraphicsObject"""
         self.color = color
+        self._version += 1
 
     def setOutlineColor(self, color):
         """Sets the Outline color for a GraphicsObject. In order to see the Outline color the user must also have
         changed the outline width which is 0 by default."""
         self.outlineColor = color
+        self._version += 1
 
     def setOutlineWidth(self, width):
         """Sets the Width of the Outline for a GraphicsObject."""
         self.outlineWidth = width
+        self._version += 1
 
 
 class Point(GraphicsObject):
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y, window):
         super().__init__(window)
         self.x = x
@@ -251,22 +967,17 @@ class Point(GraphicsObject):
     def move(self, dx, dy):
         self.x += dx
         self.y += dy
+        self._version += 1
 
 class Circle(GraphicsObject):
+    __slots__ = ("x", "y", "radius")
+
     def __init__(self, x, y, radius, window, color=(255, 255, 255), outlineWidth=0, outlineColor="BLACK"):
         super().__init__(window, color=color, outlineWidth=outlineWidth, outlineColor=outlineColor)
         invalidValueCheck(radius)
         self.x = x
         self.y = y
         self.radius = radius
-        self.fillSurface = pygame.Surface((radius * 2, radius * 2))
-        # self.fillSurface.fill(self.color)
-        self.outlineSurface = pygame.Surface((radius * 2, radius * 2))
-        # self.outlineSurface.fill(self.outlineColor)
-        self.fillSurface.set_colorkey((0, 0, 0))
-        self.outlineSurface.set_colorkey((0, 0, 0))
-        self.fillSurface.set_alpha(255)
-        self.outlineSurface.set_alpha(255)
 
     def draw(self):
         """Draws the Circle. First pass is the Circle itself if the user has not changed the outline width.
@@ -276,24 +987,21 @@ class Circle(GraphicsObject):
         if self.outlineWidth != 0:
             pygame.draw.circle(self.window.screen, self.outlineColor, (self.x, self.y), self.radius, width=self.outlineWidth)
 
-        pygame.draw.circle(self.fillSurface, self.color, (0.5 * self.radius, 0.5 * self.radius), self.radius)
-        self.window.screen.blit(self.fillSurface, (self.x - 0.5 * self.radius, self.y - 0.5 * self.radius))
-        if self.outlineWidth != 0:
-            pygame.draw.circle(self.outlineSurface, self.outlineColor, (0.5 * self.radius, 0.5 * self.radius), self.radius, self.outlineWidth)
-            self.window.screen.blit(self.outlineSurface, (self.x - 0.5 * self.radius, self.y - 0.5 * self.radius))
-
-
     def move(self, dx, dy):
         """Moves the Circle by dx and dy"""
         self.x += dx
         self.y += dy
+        self._version += 1
 
     def setCenter(self, x, y):
         self.x = x
         self.y = y
+        self._version += 1
 
 
 class Rectangle(GraphicsObject):
+    __slots__ = ("x", "y", "width", "height", "mode")
+
     def __init__(self, x, y, width, height, window, color=(255, 255, 255), outlineWidth=0, outlineColor="BLACK",
                  mode="CORNER"):
         super().__init__(window, color=color, outlineWidth=outlineWidth, outlineColor=outlineColor)
@@ -303,7 +1011,6 @@ class Rectangle(GraphicsObject):
         self.width = width
         self.height = height
         self.mode = mode
-        self.edges = {}
 
     def draw(self):
         """Draws the Rectangle. First pass is the Rectangle itself if the user has not changed the outline width.
@@ -327,16 +1034,19 @@ class Rectangle(GraphicsObject):
         if mode.upper() not in VALID_MODES:
             raise GraphicsError(INVALID_MODE)
         self.mode = mode.upper()
+        self._version += 1
 
     def move(self, dx, dy):
         """Moves the Rectangle by dx and dy"""
         self.x += dx
         self.y += dy
+        self._version += 1
 
     def setCoords(self, x, y):
         """Sets the coordinate pair of (x,y) to the new coordinates passed."""
         self.x = x
         self.y = y
+        self._version += 1
 
     def collidesWith(self, other):
         """Checks to see the Rectangle has collided with another Graphics Object.
@@ -351,6 +1061,8 @@ class Rectangle(GraphicsObject):
 
 
 class Arc(GraphicsObject):
+    __slots__ = ("x", "y", "width", "height", "startAngle", "endAngle")
+
     def __init__(self,  x, y, width, height, startAngle, endAngle, window, outlineWidth=1, outlineColor="BLACK"):
         super().__init__(window, outlineWidth=outlineWidth, outlineColor=outlineColor)
         self.x = x
@@ -371,8 +1083,11 @@ class Arc(GraphicsObject):
         """Moves the Arc by dx and dy"""
         self.x += dx
         self.y += dy
+        self._version += 1
 
 class Ellipse(GraphicsObject):
+    __slots__ = ("x", "y", "width", "height")
+
     def __init__(self, x, y, width, height, window, color=(255, 255, 255), outlineWidth=0, outlineColor="BLACK"):
         super().__init__(window, color=color, outlineWidth=outlineWidth, outlineColor=outlineColor)
         self.x = x
@@ -389,8 +1104,11 @@ class Ellipse(GraphicsObject):
         """Moves the Ellipse by dx and dy"""
         self.x += dx
         self.y += dy
+        self._version += 1
 
 class Polygon(GraphicsObject):
+    __slots__ = ("points",)
+
     def __init__(self, points, window):
         super().__init__(window)
         if not isinstance(points, (list, tuple)):
@@ -402,10 +1120,12 @@ class Polygon(GraphicsObject):
 
     def move(self, dx, dy):
         """Moves the Polygon by dx and dy"""
-        for i in range(len(self.points)):
-            self.points[i] = [self.points[i][0] + dx, self.points[i][1] + dy]
+        self.points = [[x + dx, y + dy] for x, y in self.points]
+        self._version += 1
 
 class Line(GraphicsObject):
+    __slots__ = ("x1", "y1", "x2", "y2")
+
     def __init__(self, x1, y1, x2, y2, window, color=(0, 0, 0), outlineWidth=1):
         super().__init__(window, color=color, outlineWidth=outlineWidth)
         self.x1 = x1
@@ -422,27 +1142,44 @@ class Line(GraphicsObject):
         self.x2 += dx
         self.y1 += dy
         self.y2 += dy
+        self._version += 1
 
 class Text(GraphicsObject):
-    def __init__(self, x, y, window, color=(0, 0, 0), mode="CORNER", fontSize=12, spacingFactor=0.8):
+    __slots__ = ("x", "y", "fontSize", "mode", "lines", "spacingFactor", "useAtlas", "text")
+
+    def __init__(self, x, y, window, color=(0, 0, 0), mode="CORNER", fontSize=12, spacingFactor=0.8, useAtlas=False):
+        """useAtlas draws the text from a GlyphAtlas instead of rendering it every frame. Use it for
+        text that changes often like scores and timers."""
         super().__init__(window, color=color)
         self.x = x
         self.y = y
         invalidValueCheck(fontSize)
         self.fontSize = fontSize
         self.mode = mode
+        _initFont()
         self.text = pygame.font.Font(None, self.fontSize)
         self.lines = ()
         self.spacingFactor = spacingFactor
+        self.useAtlas = useAtlas
 
     def setText(self, string: str):
         """Sets the Text of a Text object"""
         self.lines = tuple(string.split("\n"))
+        self._version += 1
 
     def setSize(self, size):
         """Sets the Font size of the Text Object"""
         invalidValueCheck(size)
         self.fontSize = size
+        self.text = pygame.font.Font(None, self.fontSize)
+        self._version += 1
+
+    def setAtlasMode(self, boolean):
+        """Sets whether the Text is drawn from a GlyphAtlas. Good for text that changes every frame."""
+        if not isinstance(boolean, bool):
+            raise GraphicsError(INVALID_BOOL)
+        self.useAtlas = boolean
+        self._version += 1
 
     def setMode(self, mode):
         """Sets the Mode of a Text Object to either CENTER or CORNER. This determines if the coordinate pair is the
@@ -450,9 +1187,13 @@ class Text(GraphicsObject):
         if mode.upper() not in VALID_MODES:
             raise GraphicsError(INVALID_MODE)
         self.mode = mode.upper()
+        self._version += 1
 
     def draw(self):
         """Draws the Text object"""
+        if self.useAtlas:
+            self._drawFromAtlas()
+            return
         for i in range(len(self.lines)):
             textSurface = self.text.render(self.lines[i], True, self.color)
             if self.mode == "CORNER":
@@ -460,47 +1201,127 @@ class Text(GraphicsObject):
             else:
                 self.window.screen.blit(textSurface, textSurface.get_rect(center=(self.x, self.y + (i - len(self.lines) / 2 + .5) * self.fontSize * self.spacingFactor)))
 
+    def _drawFromAtlas(self):
+        """Draws every line with a single blits call of glyphs from the shared GlyphAtlas."""
+        atlas = getGlyphAtlas(self.fontSize, self.color)
+        blits = []
+        for i in range(len(self.lines)):
+            line = self.lines[i]
+            if self.mode == "CORNER":
+                x = self.x
+                y = self.y + i * self.fontSize * self.spacingFactor
+            else:
+                x = self.x - atlas.getWidth(line) / 2
+                y = self.y + (i - len(self.lines) / 2 + .5) * self.fontSize * self.spacingFactor - atlas.height / 2
+            blits.extend(atlas.layout(line, x, y)[0])
+        self.window.screen.blits(blits, doreturn=False)
+
 
 class Image(GraphicsObject):
-    def __init__(self, x, y, window, file, transparent=False):
+    __slots__ = ("x", "y", "image", "rotation", "file", "transparent", "originalImage", "scaledImage",
+                 "scaledSize", "sizeX", "sizeY", "flipX", "flipY", "transformCache")
+
+    def __init__(self, x, y, window, file, transparent=False, surface=None):
+        """surface can be a Surface already decoded from file (for example on another thread) so the
+        Image does not have to load the file again."""
         super().__init__(window)
         self.x = x
         self.y = y
         self.file = file
         self.transparent = transparent
-        self.originalImage = self._createImage()
+        self.originalImage = self._createImage(surface)
         self.scaledImage = self.originalImage
         self.image = self.originalImage
         self.sizeX, self.sizeY = self.scaledImage.get_size()
+        self.scaledSize = (self.sizeX, self.sizeY)
         self.rotation = 0.0
+        self.flipX = False
+        self.flipY = False
+        # (sizeX, sizeY, rotation, flipX, flipY) -> [transformed surface, collision mask or None], oldest use first
+        self.transformCache = {self._transformKey(): [self.image, None]}
 
-
-    def _createImage(self):
+    def _createImage(self, surface=None):
         """Creates the Image object. If the image has a transparent background use convert_alpha otherwise convert.
         This is for efficiency purposes within pygame."""
+        if surface is None:
+            region = _atlasRegions.get((self.file, bool(self.transparent)))
+            if region is not None:
+                # Shared with every Image of the file until _ownImage copies it for a change
+                return region
+            surface = loadImageFile(self.file)
         if self.transparent:
-            return pygame.image.load(self.file).convert_alpha()
-        return pygame.image.load(self.file).convert()
+            return surface.convert_alpha()
+        return surface.convert()
 
     def draw(self):
         """Draws the Image"""
         self.window.screen.blit(self.image, self.image.get_rect(center=(self.x, self.y)))
 
+    def _transformKey(self):
+        return (self.sizeX, self.sizeY, self.rotation, self.flipX, self.flipY)
+
+    def _cacheTransform(self, key, image):
+        """Internal method that adds a transformed surface to the cache, dropping the least recently used one
+        when it is full. Sizes and angles that change every frame would otherwise fill it with surfaces that
+        are never used again."""
+        if len(self.transformCache) >= TRANSFORM_CACHE_SIZE:
+            del self.transformCache[next(iter(self.transformCache))]
+        cached = [image, None]
+        self.transformCache[key] = cached
+        return cached
+
+    def _updateImage(self):
+        """Internal method that sets image to the original scaled, rotated and flipped. The last few transforms
+        are cached, so flipping back and forth or switching between a couple of sizes does not transform again."""
+        key = self._transformKey()
+        cached = self.transformCache.pop(key, None)
+        if cached is None:
+            if self.scaledSize != (self.sizeX, self.sizeY):
+                self.scaledImage = pygame.transform.scale(self.originalImage, (self.sizeX, self.sizeY))
+                self.scaledSize = (self.sizeX, self.sizeY)
+            image = pygame.transform.rotate(self.scaledImage, self.rotation)
+            if self.flipX or self.flipY:
+                image = pygame.transform.flip(image, self.flipX, self.flipY)
+            cached = self._cacheTransform(key, image)
+        else:
+            # Put it back at the end so it is the most recently used
+            self.transformCache[key] = cached
+        self.image = cached[0]
+        self._version += 1
+
+    def _ownImage(self):
+        """Internal method called before the pixels of image are changed in place. A subsurface (an atlas region
+        or a frame of a sprite sheet) shares its pixels with every other Image cut from the same surface, so it
+        is copied first."""
+        if self.image.get_parent() is None:
+            return
+        image = self.image.copy()
+        if self.scaledImage is self.image:
+            self.scaledImage = image
+        if self.originalImage is self.image:
+            self.originalImage = image
+        self.image = image
+
+    def _invalidateTransforms(self):
+        """Internal method used after the pixels of image were changed in place. Every other cached transform
+        and every collision mask is now out of date."""
+        self.transformCache.clear()
+        self.transformCache[self._transformKey()] = [self.image, None]
+        self._version += 1
+
     def resizeImage(self, width, height):
         """Resizes the image to the width and height passed to the function."""
         invalidValueCheck(width, height)
         self.sizeX = width
         self.sizeY = height
-        self.scaledImage = pygame.transform.scale(self.originalImage, (width, height))
-        self.image = pygame.transform.rotate(self.scaledImage, self.rotation)
+        self._updateImage()
 
     def scaleImage(self, scalar):
         """Scales the size of the image based on the scalar passes to the function."""
         invalidValueCheck(scalar)
         self.sizeX *= scalar
         self.sizeY *= scalar
-        self.scaledImage = pygame.transform.scale(self.originalImage, (self.sizeX, self.sizeY))
-        self.image = pygame.transform.rotate(self.scaledImage, self.rotation)
+        self._updateImage()
 
     def getHeight(self):
         """Returns the height of the image."""
@@ -515,31 +1336,204 @@ class Image(GraphicsObject):
         if not isinstance(degrees, (int, float)):
             raise GraphicsError(f"Expected int or float. Instead received {degrees}")
         self.rotation = degrees
-        self.image = pygame.transform.rotate(self.scaledImage, self.rotation)
+        self._updateImage()
 
     def rotateImage(self, degrees):
         """Rotates the image by degrees."""
         if not isinstance(degrees, (int, float)):
             raise GraphicsError(f"Expected int or float. Instead received {degrees}")
         self.rotation += degrees
-        self.image = pygame.transform.rotate(self.scaledImage, self.rotation)
+        self._updateImage()
 
     def flipVertically(self):
         """Flips the image vertically."""
-        self.image = pygame.transform.flip(self.image, False, True)
+        self.flipY = not self.flipY
+        self._updateImage()
 
     def flipHorizontally(self):
         """Flips the image horizontally."""
-        self.image = pygame.transform.flip(self.image, True, False)
+        self.flipX = not self.flipX
+        self._updateImage()
 
     def move(self, dx, dy):
         """Moves the image by dx and dy."""
         self.x += dx
         self.y += dy
+        self._version += 1
 
     def moveTo(self, x, y):
         self.x = x
         self.y = y
+        self._version += 1
+
+    def getRect(self):
+        """Returns the pygame Rect the image is drawn in."""
+        return self.image.get_rect(center=(self.x, self.y))
+
+    def getMask(self):
+        """Returns a pygame Mask of the image as it is currently drawn. It is built the first time it is
+        needed and kept next to the transformed image, so it is only rebuilt when the image changes."""
+        key = self._transformKey()
+        cached = self.transformCache.get(key)
+        if cached is None or cached[0] is not self.image:
+            self.transformCache.pop(key, None)
+            cached = self._cacheTransform(key, self.image)
+        if cached[1] is None:
+            cached[1] = pygame.mask.from_surface(self.image)
+        return cached[1]
+
+    def getCollisionPoint(self, other):
+        """Returns the first (x, y) position on the window where this image and the other Image overlap
+        with pixels that are not transparent, or None if they do not."""
+        rect = self.getRect()
+        otherRect = other.getRect()
+        if not rect.colliderect(otherRect):
+            return None
+        point = self.getMask().overlap(other.getMask(), (otherRect.x - rect.x, otherRect.y - rect.y))
+        if point is None:
+            return None
+        return rect.x + point[0], rect.y + point[1]
+
+    def collidesWith(self, other):
+        """Checks to see if this image overlaps the other Image, pixel by pixel."""
+        return self.getCollisionPoint(other) is not None
+
+    def collideList(self, others):
+        """Returns the Images in others that overlap this image pixel by pixel. All the bounding rects are
+        tested in one go first so only the images that are close get their masks compared."""
+        rect = self.getRect()
+        otherRects = [other.getRect() for other in others]
+        mask = None
+        hits = []
+        for i in rect.collidelistall(otherRects):
+            if mask is None:
+                mask = self.getMask()
+            offset = (otherRects[i].x - rect.x, otherRects[i].y - rect.y)
+            if mask.overlap(others[i].getMask(), offset) is not None:
+                hits.append(others[i])
+        return hits
+
+    @contextlib.contextmanager
+    def pixels(self, kind="rgb"):
+        """Used in a with block to get a NumPy array of the pixels of the image as it is currently drawn.
+        Changes are written to the image when the with block ends. An image that has not been resized, rotated
+        or flipped is drawn straight from its original, so the changes are kept by later transforms. Otherwise
+        only the transformed copy is changed and the next transform starts over from the unchanged original.
+        The array is a copy, use editPixels to work on the pixels without copying them."""
+        self._ownImage()
+        with _editedPixels(self.image, kind) as array:
+            yield array
+        self._invalidateTransforms()
+
+    def editPixels(self, function, kind="rgb"):
+        """Calls function with a NumPy array that points straight at the pixels of the image as it is currently
+        drawn and returns what function returns. Works like pixels without the copy, and like
+        Window.editPixels function must not keep the array."""
+        self._ownImage()
+        result = _editPixels(self.image, function, kind)
+        self._invalidateTransforms()
+        return result
+
+    @contextlib.contextmanager
+    def pixelBuffer(self):
+        """Used in a with block to get a memoryview of the raw bytes of the image. The memoryview can not be
+        used after the with block ends."""
+        self._ownImage()
+        with _lockedBuffer(self.image) as view:
+            yield view
+        self._invalidateTransforms()
+
+    def getColorHistogram(self):
+        """Returns a dict of how many pixels of each RGB color are in the image."""
+        return _colorHistogram(self.image)
+
+    def swapPalette(self, palette):
+        """Replaces every color that is a key of palette with its value."""
+        self._ownImage()
+        _swapPalette(self.image, palette)
+        self._invalidateTransforms()
+
+    def fade(self, amount, color="BLACK"):
+        """Blends the image towards color by amount, which is between 0 and 1."""
+        self._ownImage()
+        _fade(self.image, amount, color)
+        self._invalidateTransforms()
+
+class Animation(Image):
+    """An Image that plays the frames of a sprite sheet. The sheet is cut into frameWidth x frameHeight frames
+    from left to right and top to bottom. Every frame is a subsurface of the sheet (which can itself be in an
+    atlas), so no pixels are copied. Call update with the frame time every frame to play it."""
+    __slots__ = ("frames", "frame", "fps", "loop", "playing", "frameTimer")
+
+    def __init__(self, x, y, window, file, frameWidth, frameHeight, fps=12, loop=True, frameCount=None):
+        self.frame = 0   # Needed by _transformKey while Image sets itself up with the whole sheet
+        super().__init__(x, y, window, file, transparent=True)
+        sheet = self.originalImage
+        columns = sheet.get_width() // frameWidth
+        rows = sheet.get_height() // frameHeight
+        if columns == 0 or rows == 0:
+            raise GraphicsError(INVALID_FRAME_SIZE)
+        invalidValueCheck(fps)
+        self.frames = [sheet.subsurface((column * frameWidth, row * frameHeight, frameWidth, frameHeight))
+                       for row in range(rows) for column in range(columns)][:frameCount]
+        self.fps = fps
+        self.loop = loop
+        self.playing = True
+        self.frameTimer = 0.0
+        self.sizeX = frameWidth
+        self.sizeY = frameHeight
+        self.transformCache.clear()
+        self.setFrame(0)
+
+    def _transformKey(self):
+        return (self.frame, self.sizeX, self.sizeY, self.rotation, self.flipX, self.flipY)
+
+    def setFrame(self, frame):
+        """Shows the frame with the given index."""
+        self.frame = frame % len(self.frames)
+        self.originalImage = self.frames[self.frame]
+        self.scaledSize = None   # The scaled image is of the last frame now
+        self._updateImage()
+
+    def getFrame(self):
+        """Returns the index of the frame being shown"""
+        return self.frame
+
+    def getFrameCount(self):
+        """Returns how many frames the animation has"""
+        return len(self.frames)
+
+    def play(self):
+        self.playing = True
+
+    def pause(self):
+        self.playing = False
+
+    def restart(self):
+        """Goes back to the first frame and plays."""
+        self.frameTimer = 0.0
+        self.playing = True
+        self.setFrame(0)
+
+    def isFinished(self):
+        """Checks to see if an animation that does not loop has shown its last frame"""
+        return not self.loop and self.frame == len(self.frames) - 1 and not self.playing
+
+    def update(self, frameTime):
+        """Advances the animation by frameTime seconds."""
+        if not self.playing:
+            return
+        self.frameTimer += frameTime * self.fps
+        if self.frameTimer < 1:
+            return
+        steps = int(self.frameTimer)
+        self.frameTimer -= steps
+        frame = self.frame + steps
+        if frame >= len(self.frames) and not self.loop:
+            frame = len(self.frames) - 1
+            self.playing = False
+        self.setFrame(frame)
+
 
 def testFunction():
     win = Window(600, 400)
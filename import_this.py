@@ -1,7 +1,10 @@
+import importlib
+
 import graphics
 from inputs import (hasJoystickChangedDirections,
                     get_joystick_angle,
                     get_joystick_magnitude,
+                    get_player_count,
                     hasKeybindBeenPressed,
                     isKeybindFirstPressed,
                     isKeybindDown)
@@ -9,3 +12,20 @@ from inputs import (hasJoystickChangedDirections,
 win: graphics.Window = None
 frame_time = 0.005
 frame_num = 0
+store: "storage.Store" = None   # Save data and high scores of the game that is running
+
+# These pull in NumPy and friends, so they are only imported the first time a game uses them instead of while
+# the launcher starts. "from import_this import *" in a game imports them through __all__.
+LAZY_MODULES = ("ecs", "tween", "storage")
+
+__all__ = ["graphics", "hasJoystickChangedDirections", "get_joystick_angle", "get_joystick_magnitude",
+           "get_player_count", "hasKeybindBeenPressed", "isKeybindFirstPressed", "isKeybindDown",
+           "win", "frame_time", "frame_num", "store"] + list(LAZY_MODULES)
+
+
+def __getattr__(name):
+    if name in LAZY_MODULES:
+        module = importlib.import_module(name)
+        globals()[name] = module
+        return module
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
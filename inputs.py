@@ -1,9 +1,23 @@
 import math
 
+import pygame
+
 import graphics as g
 
 win: g.Window = None
-kbm = True
+kbm = True   # The keyboard controls the first player, with or without a controller
+use_controllers = True
+
+# Controller settings
+deadzone = 0.2   # Sticks closer to the center than this (0 to 1) count as centered
+smoothing = 0.0   # 0 uses the newest stick position, closer to 1 smooths out jitter but adds lag
+max_players = 4
+low_latency = True   # Sample controllers again right before the game updates instead of only at the start of the frame
+
+JOYSTICK_EVENTS = (pygame.JOYAXISMOTION, pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP, pygame.JOYHATMOTION,
+                   pygame.JOYDEVICEADDED, pygame.JOYDEVICEREMOVED)
+AXIS_X = 0
+AXIS_Y = 1
 
 joystick_angle = 0
 joystick_magnitude = 0
@@ -11,77 +25,236 @@ joystick_magnitude = 0
 prev_joystick_angle = 0
 prev_joystick_magnitude = 0
 
+controllers_initialized = False
+
 
 class Keybinding:
 
-    def __init__(self, name: str, key: str):
+    def __init__(self, name: str, key: str, button: int):
         self.name = name
         self.key = key
+        self.button = button
         self.down = False
         self.prevDown = False
 
 
 keybindings = (
-    Keybinding("button1", "h"),
-    Keybinding("button2", "j"),
-    Keybinding("button3", "k"),
-    Keybinding("button4", "l")
+    Keybinding("button1", "h", 0),
+    Keybinding("button2", "j", 1),
+    Keybinding("button3", "k", 2),
+    Keybinding("button4", "l", 3)
 )
 
 
-def update():
-    global joystick_angle, joystick_magnitude, prev_joystick_angle, prev_joystick_magnitude
+class Pad:
+    """State of one controller, kept up to date from SDL joystick events. Synthetic events posted with
+    pygame.event.post work the same as real ones, so the dummy video driver can be used to test it."""
 
-    prev_joystick_magnitude = joystick_magnitude
-    prev_joystick_angle = joystick_angle
+    def __init__(self, instance_id: int, joystick=None):
+        self.instance_id = instance_id
+        self.joystick = joystick   # Kept so SDL keeps the device open
+        self.axes = {}
+        self.buttons = set()
+        self.hat = (0, 0)
+        self.filtered_x = 0.0
+        self.filtered_y = 0.0
 
-    if kbm:
+    def get_stick(self, commit: bool):
+        """Returns the stick position with the radial deadzone and smoothing applied. The smoothing only moves
+        forward when commit is True so sampling more than once in a frame does not smooth more."""
+        x = self.axes.get(AXIS_X, 0.0)
+        y = self.axes.get(AXIS_Y, 0.0)
+        if x == 0 and y == 0 and self.hat != (0, 0):
+            x, y = self.hat[0], -self.hat[1]
 
-        joystick_x = int(win.isKeyPressed("d")) - int(win.isKeyPressed("a"))
-        joystick_y = int(win.isKeyPressed("s")) - int(win.isKeyPressed("w"))
-        joystick_angle = math.degrees(math.atan2(joystick_y, joystick_x)) % 360.0
-        if joystick_x == 0 and joystick_y == 0:
-            joystick_magnitude = 0
+        magnitude = math.hypot(x, y)
+        if magnitude < deadzone:
+            x = y = 0.0
         else:
-            joystick_magnitude = 1
+            scale = min(1.0, (magnitude - deadzone) / (1.0 - deadzone)) / magnitude
+            x *= scale
+            y *= scale
+
+        x = self.filtered_x + (x - self.filtered_x) * (1.0 - smoothing)
+        y = self.filtered_y + (y - self.filtered_y) * (1.0 - smoothing)
+        if commit:
+            self.filtered_x = x
+            self.filtered_y = y
+        return x, y
+
+
+class Player:
+
+    def __init__(self):
+        self.pad: Pad = None
+        self.angle = 0
+        self.magnitude = 0
+        self.prev_angle = 0
+        self.prev_magnitude = 0
+        self.down = set()   # Names of the keybindings that are down
+        self.prev_down = set()
 
-        for keybind in keybindings:
-            keybind.prevDown = keybind.down
-            keybind.down = win.isKeyPressed(keybind.key)
 
+pads: dict[int, Pad] = {}
+players = [Player() for i in range(max_players)]
+
+
+def add_pad(event) -> Pad:
+    """Opens a controller and gives it to the first player without one."""
+    instance_id = getattr(event, "instance_id", None)
+    joystick = None
+    if event.type == pygame.JOYDEVICEADDED:
+        try:
+            joystick = pygame.joystick.Joystick(event.device_index)
+            instance_id = joystick.get_instance_id()
+        except pygame.error:
+            # not a real device, like an event posted by a test
+            if instance_id is None:
+                instance_id = event.device_index
+
+    if instance_id in pads:
+        return pads[instance_id]
+    pad = Pad(instance_id, joystick)
+    pads[instance_id] = pad
+    for player in players:
+        if player.pad is None:
+            player.pad = pad
+            break
+    return pad
+
+
+def remove_pad(instance_id: int):
+    pad = pads.pop(instance_id, None)
+    for player in players:
+        if pad is not None and player.pad is pad:
+            player.pad = None
+
+
+def handle_event(event):
+    if event.type == pygame.JOYDEVICEADDED:
+        add_pad(event)
+    elif event.type == pygame.JOYDEVICEREMOVED:
+        remove_pad(event.instance_id)
     else:
-        pass
+        pad = pads.get(event.instance_id)
+        if pad is None:
+            pad = add_pad(event)
+        if event.type == pygame.JOYAXISMOTION:
+            pad.axes[event.axis] = event.value
+        elif event.type == pygame.JOYBUTTONDOWN:
+            pad.buttons.add(event.button)
+        elif event.type == pygame.JOYBUTTONUP:
+            pad.buttons.discard(event.button)
+        elif event.type == pygame.JOYHATMOTION and event.hat == 0:
+            pad.hat = event.value
+
 
-def getJoystickQuadrant():
-    return ((joystick_angle + 45.0) % 360) // 90
+def init_controllers():
+    """Starts the joystick subsystem the first time input is read. SDL then sends a JOYDEVICEADDED event for
+    every controller that is already plugged in, and again for every one plugged in later."""
+    global controllers_initialized
 
-def hasJoystickChangedDirections():
-    return (joystick_magnitude != 0 and
-            ((joystick_magnitude != 0 and prev_joystick_magnitude == 0) or
-             ((joystick_angle + 45.0) % 360) // 90 != ((prev_joystick_angle + 45.0) % 360) // 90))
+    controllers_initialized = True
+    # The events have to be allowed first, SDL drops the added events of controllers that are already
+    # plugged in if they are still blocked when the subsystem starts
+    for event_type in JOYSTICK_EVENTS:
+        win.addListener(event_type, handle_event)
+    pygame.joystick.init()
 
-def get_joystick_angle():
-    return joystick_angle
 
-def get_joystick_magnitude():
-    return joystick_magnitude
+def sample(index: int, player: Player, commit: bool):
+    x = y = 0.0
+    down = set()
+
+    if player.pad is not None:
+        x, y = player.pad.get_stick(commit)
+        for keybind in keybindings:
+            if keybind.button in player.pad.buttons:
+                down.add(keybind.name)
+
+    if index == 0 and kbm:
+        keyboard_x = int(win.isKeyPressed("d")) - int(win.isKeyPressed("a"))
+        keyboard_y = int(win.isKeyPressed("s")) - int(win.isKeyPressed("w"))
+        if keyboard_x != 0 or keyboard_y != 0:
+            length = math.hypot(keyboard_x, keyboard_y)
+            x = keyboard_x / length
+            y = keyboard_y / length
+        for keybind in keybindings:
+            if win.isKeyPressed(keybind.key):
+                down.add(keybind.name)
+
+    player.angle = math.degrees(math.atan2(y, x)) % 360.0
+    player.magnitude = min(1.0, math.hypot(x, y))
+    player.down = down
+
+
+def mirror_first_player():
+    """Copies the first player's state to the module variables and keybindings the games already use."""
+    global joystick_angle, joystick_magnitude, prev_joystick_angle, prev_joystick_magnitude
+
+    player = players[0]
+    joystick_angle = player.angle
+    joystick_magnitude = player.magnitude
+    prev_joystick_angle = player.prev_angle
+    prev_joystick_magnitude = player.prev_magnitude
+    for keybind in keybindings:
+        keybind.prevDown = keybind.name in player.prev_down
+        keybind.down = keybind.name in player.down
+
+
+def update():
+    if use_controllers and not controllers_initialized:
+        init_controllers()
+
+    for index in range(len(players)):
+        player = players[index]
+        player.prev_angle = player.angle
+        player.prev_magnitude = player.magnitude
+        player.prev_down = player.down
+        sample(index, player, True)
+
+    mirror_first_player()
+
+
+def poll():
+    """Low latency path called right before the game updates. Handles controller events that arrived since
+    the frame started and samples every player again, without moving the previous frame's state. The events
+    go through the window like the ones from update, so handle_event and any game listeners see them."""
+    if not controllers_initialized:
+        return
+    win.handleEvents(pygame.event.get(JOYSTICK_EVENTS))
+    for index in range(len(players)):
+        sample(index, players[index], False)
+    mirror_first_player()
+
+def get_player_count():
+    """Returns how many players have a controller (the first player always counts for the keyboard)."""
+    return max(int(kbm), sum(1 for player in players if player.pad is not None))
+
+def getJoystickQuadrant(player: int = 0):
+    return ((players[player].angle + 45.0) % 360) // 90
+
+def hasJoystickChangedDirections(player: int = 0):
+    state = players[player]
+    return (state.magnitude != 0 and
+            ((state.magnitude != 0 and state.prev_magnitude == 0) or
+             ((state.angle + 45.0) % 360) // 90 != ((state.prev_angle + 45.0) % 360) // 90))
+
+def get_joystick_angle(player: int = 0):
+    return players[player].angle
+
+def get_joystick_magnitude(player: int = 0):
+    return players[player].magnitude
 
 # the first frame when its first being pressed
-def isKeybindFirstPressed(name: str):
-    for i in keybindings:
-        if i.name == name and i.down and not i.prevDown:
-            return True
-    return False
+def isKeybindFirstPressed(name: str, player: int = 0):
+    state = players[player]
+    return name in state.down and name not in state.prev_down
 
 # when it has been pressed (just released)
-def hasKeybindBeenPressed(name: str):
-    for i in keybindings:
-        if i.name == name and not i.down and i.prevDown:
-            return True
-    return False
-
-def isKeybindDown(name: str):
-    for i in keybindings:
-        if i.name == name and i.down:
-            return True
-    return False
+def hasKeybindBeenPressed(name: str, player: int = 0):
+    state = players[player]
+    return name not in state.down and name in state.prev_down
+
+def isKeybindDown(name: str, player: int = 0):
+    return name in players[player].down
@@ -1,10 +1,13 @@
 import time
 
+import pygame
+
 import menu
 import game_handler
 import graphics as g
 import inputs
 import import_this
+import storage
 
 is_running = True
 is_in_game = False
@@ -13,23 +16,58 @@ win: g.Window = None
 
 prev_frame_time = 0.0
 
+# Frame capture for attract mode loops and bug reports
+# capture_enabled keeps the last capture_seconds of frames in memory from launch so they can always be saved.
+# It is off by default because the frames take memory and every shown frame gets scaled down, so instead
+# capture starts the first time one of the keys is pressed.
+capture_enabled = False
+capture_seconds = 10
+capture_toggle_key = pygame.K_F9   # Start or stop writing every frame to disk
+capture_save_key = pygame.K_F10   # Save the last capture_seconds of frames
+
 def initialize():
     global win, prev_frame_time
+    storage.preload()
     win = g.Window(1920, 1080)
     win.setBackground((0, 0, 0))
+    if capture_enabled:
+        win.enableCapture(seconds=capture_seconds)
     menu.win = win
     inputs.win = win
     game_handler.win = win
     menu.initialize()
     prev_frame_time = time.time()
 
+def handle_capture_keys():
+    if win.isKeyFirstPressed(capture_toggle_key):
+        if win.isCapturing():
+            win.stopCapture()
+        else:
+            if not win.isCaptureEnabled():
+                win.enableCapture(seconds=capture_seconds)
+            win.startCapture()
+    if win.isKeyFirstPressed(capture_save_key):
+        if not win.isCaptureEnabled():
+            win.enableCapture(seconds=capture_seconds)
+            if game_handler.debug_mode:
+                print("Keeping the last " + str(capture_seconds) + " seconds of frames from now on")
+            return
+        frames = win.saveCapture(capture_seconds)
+        if game_handler.debug_mode:
+            print("Saving " + str(frames) + " captured frames (" + str(win.getDroppedFrames()) + " dropped)")
+
 def update():
     global is_in_game, prev_frame_time
 
     win.update()
+    if not win.running:
+        # The window was closed and pygame has quit, main() unloads everything
+        return
 
     inputs.update()
 
+    handle_capture_keys()
+
     if is_in_game:
 
         if game_handler.should_close():
@@ -37,6 +75,8 @@ def update():
             menu.load()
             is_in_game = False
         else:
+            if inputs.low_latency:
+                inputs.poll()
             game_handler.update()
 
     else:
@@ -59,7 +99,7 @@ def update():
 def main():
     initialize()
 
-    while is_running:
+    while is_running and win.running:
         update()
 
     if is_in_game:
@@ -67,6 +107,9 @@ def main():
     else:
         menu.unload()
 
+    win.disableCapture()
+    storage.close_all()
+
 
 if __name__ == '__main__':
     main()
@@ -1,7 +1,11 @@
 from __future__ import annotations
+import importlib
+import queue
+import threading
 import graphics as g
 import os
 import game_handler
+import bundle
 import traceback
 import inputs
 import import_this
@@ -24,12 +28,24 @@ num_game_previews = 0
 scroll_offset = 0.0
 selected_game = 0
 preview_spacing = 360
-scroll_speed = 3.0
+scroll_time = 0.3   # Seconds the carousel takes to slide to the next game
+scroll_easing = "outCubic"
+carousel: tween.Tweener = None   # Made on the first scroll, tween (and NumPy) is imported after startup
+laid_out_at = None   # (scroll_offset, selected_game) the previews were last positioned for
+
+is_loaded = True
+
+# Startup
+# Game icons are decoded on background threads and added to the menu once they are ready instead of before
+# the first frame. Modules only needed once the menu is running are imported on a thread after that.
+icon_loaders = 2   # Number of threads decoding icons (plain threads, concurrent.futures is slow to import)
+icon_results: queue.Queue = None   # (path, surface or the exception raised) put by the loader threads
+pending_icons: set[str] = set()   # Paths of icons that are not in the menu yet
 
 
 class GamePreview:
 
-    def __init__(self, game: Game, img: g.Image):
+    def __init__(self, game: Game, img: g.Image = None):
         self.game = game
         self.img = img
 
@@ -44,37 +60,84 @@ class Game:
 
         self.description = description
 
+def read_info(name: str, info: str, games: dict[str, Game]):
+    lines = info.splitlines(keepends=True)
+    desc = ""
+    for i in lines[1:]:
+        desc += i
+    games[name] = Game(name, "games/" + name + "/icon.png", lines[0], desc)
+
 def get_valid_games():
     games = {}
-    for entry in os.scandir("games"):
+    entries = list(os.scandir("games"))
+
+    # Bundled games are used instead of a folder with the same name
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.name.endswith(bundle.BUNDLE_EXTENSION):
+                game_bundle = bundle.open_bundle(entry.path)
+                read_info(game_bundle.name, game_bundle.read_text("info.txt"), games)
+        except Exception as e:
+            if game_handler.debug_mode:
+                print("Error while reading game bundle: " + entry.name)
+                traceback.print_exc()
+
+    for entry in entries:
         try:
-            if entry.is_dir():
+            if entry.is_dir() and entry.name not in games:
                 path = entry.path
                 valid = True
                 valid &= os.path.exists(path + "/icon.png")
                 valid &= os.path.exists(path + "/info.txt")
                 valid &= os.path.exists(path + "/" + entry.name + ".py")
                 with open(path + "/info.txt", "r") as file:
-                    lines = file.readlines()
                     if valid:
-                        desc = ""
-                        for i in lines[1:]:
-                            desc += i
-                        games[entry.name] = Game(entry.name, path + "/icon.png", lines[0], desc)
+                        read_info(entry.name, file.read(), games)
         except Exception as e:
             if game_handler.debug_mode:
                 print("Error while reading game with name: " + entry.name)
                 traceback.print_exc()
     return games
 
+def load_icons(paths: list[str]):
+    """Runs on a loader thread and decodes every icon in paths."""
+    for path in paths:
+        try:
+            icon_results.put((path, g.loadImageFile(path)))
+        except Exception as e:
+            icon_results.put((path, e))
+
+def stream_icons():
+    """Adds icons that have finished decoding on the loader threads to their previews."""
+    while True:
+        try:
+            path, surface = icon_results.get_nowait()
+        except queue.Empty:
+            break
+        pending_icons.discard(path)
+        if isinstance(surface, Exception):
+            if game_handler.debug_mode:
+                print("Error while loading icon: " + path)
+                traceback.print_exception(type(surface), surface, surface.__traceback__)
+            continue
+        for prev in game_previews:
+            if prev.game.img_path == path:
+                prev.img = g.Image(0, 0, win, path, surface=surface)
+                prev.img.setVisibility(is_loaded)
+        layout_previews()
+
+    if len(pending_icons) == 0:
+        # Every icon is in, so get tween imported before the first scroll needs it
+        threading.Thread(target=importlib.import_module, args=("tween",), name="MenuPreload", daemon=True).start()
+
 def initialize():
-    global main_menu_image, games, game_previews, num_game_previews, game_name_text, game_description_text, fps_text
+    global main_menu_image, games, game_previews, num_game_previews, game_name_text, game_description_text, fps_text, icon_results
 
     main_menu_image = g.Image(1920 // 2, 1080 // 2, win, "resources/main_menu.png")
     main_menu_image.resizeImage(1920, 1080)
 
     if game_handler.debug_mode:
-        fps_text = g.Text(0, 0, win, fontSize=64, color=(255, 255, 255))
+        fps_text = g.Text(0, 0, win, fontSize=64, color=(255, 255, 255), useAtlas=True)
 
     game_name_text = g.Text(350, 790, win, fontSize=128, color=(20, 52, 100))
     game_description_text = g.Text(350, 880, win, fontSize=64, color=(20, 52, 100))
@@ -82,21 +145,31 @@ def initialize():
 
     games = get_valid_games()
 
-    game_previews = [GamePreview(games[game], g.Image(0, 0, win, games[game].img_path)) for game in games]
+    game_previews = [GamePreview(games[game]) for game in games]
     while len(game_previews) < 7:
-        game_previews.extend([GamePreview(games[game], g.Image(0, 0, win, games[game].img_path)) for game in games])
+        game_previews.extend([GamePreview(games[game]) for game in games])
     game_previews = tuple(game_previews)
     num_game_previews = len(game_previews)
 
+    icon_results = queue.Queue()
+    paths = [game.img_path for game in games.values()]
+    pending_icons.update(paths)
+    for i in range(icon_loaders):
+        threading.Thread(target=load_icons, args=(paths[i::icon_loaders],), name="IconLoader", daemon=True).start()
+
     game_name_text.setText(game_previews[selected_game].game.name)
     game_description_text.setText(game_previews[selected_game].game.description)
 
 def load():
+    global is_loaded
+
+    is_loaded = True
     main_menu_image.setVisibility(True)
     game_name_text.setVisibility(True)
     game_description_text.setVisibility(True)
     for prev in game_previews:
-        prev.img.setVisibility(True)
+        if prev.img is not None:
+            prev.img.setVisibility(True)
 
 def game_to_play() -> str:
     if inputs.hasKeybindBeenPressed("button1"):
@@ -104,36 +177,61 @@ def game_to_play() -> str:
         return game_previews[selected_game].game.file_name
     return ""
 
+def set_scroll_offset(value: float):
+    global scroll_offset
+    scroll_offset = value
+
+def layout_previews():
+    """Positions and sizes every preview for the current scroll_offset and selected_game."""
+    global laid_out_at
+
+    laid_out_at = (scroll_offset, selected_game)
+    for i in range(num_game_previews):
+        prev = game_previews[i]
+        if prev.img is None:
+            continue
+        slot = (i + scroll_offset + selected_game + 3.0) % num_game_previews - 3.0
+        x = 960 + slot * preview_spacing
+        size = 320.0 + -abs(x - 960) / 1920 * 192
+        prev.img.moveTo(x, 380)
+        prev.img.resizeImage(size, size)
+
 def update():
-    global scroll_offset, selected_game, game_name_text, game_description_text
+    global scroll_offset, selected_game, game_name_text, game_description_text, carousel
 
     if game_handler.debug_mode:
         fps_text.setText(str(int(frame_memory / sum(fps_list) * 100) / 100))
         fps_list[import_this.frame_num % frame_memory] = import_this.frame_time
 
-    for i in range(num_game_previews):
-        x = 960 + ((i + scroll_offset + selected_game + 3.0) % num_game_previews - 3.0) * preview_spacing
-        game_previews[i].img.moveTo(x, 380)
-
-        size = 320.0 + -abs(x - 960) / 1920 * 192
-        game_previews[i].img.resizeImage(size, size)
+    if len(pending_icons) > 0:
+        stream_icons()
 
     if inputs.hasJoystickChangedDirections() and (inputs.getJoystickQuadrant() == 0 or inputs.getJoystickQuadrant() == 2):
         direction = inputs.getJoystickQuadrant() - 1
         selected_game = (int(direction) + selected_game) % num_game_previews
         scroll_offset -= direction
+        if carousel is None:
+            import tween
+            carousel = tween.Tweener()
+        carousel.addFunction(set_scroll_offset, scroll_offset, 0.0, scroll_time, scroll_easing)
 
         game_name_text.setText(game_previews[selected_game].game.name)
         game_description_text.setText(game_previews[selected_game].game.description)
 
-    if scroll_offset > scroll_speed * import_this.frame_time:
-        scroll_offset -= scroll_speed * import_this.frame_time
-    elif scroll_offset < -scroll_speed * import_this.frame_time:
-        scroll_offset += scroll_speed * import_this.frame_time
+    if carousel is not None:
+        carousel.update(import_this.frame_time)
+
+    # The previews only move while the carousel is sliding
+    if laid_out_at != (scroll_offset, selected_game):
+        layout_previews()
 
 def unload():
+    global is_loaded
+
+    is_loaded = False
     main_menu_image.setVisibility(False)
     game_name_text.setVisibility(False)
     game_description_text.setVisibility(False)
     for prev in game_previews:
-        prev.img.setVisibility(False)
+        if prev.img is not None:
+            prev.img.setVisibility(False)
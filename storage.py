@@ -0,0 +1,254 @@
+"""Save data and high scores for games that never make the game wait on the disk.
+
+Every game gets its own Store (import_this.store while it is running). Reads come from a dict in memory.
+Writes update the dict right away and queue a record for a background thread, which appends records to a log
+file in batches and fsyncs them. The log is compacted into a snapshot of the live data once it grows too big.
+
+Each record in the log is its length and a crc32 followed by the JSON of the change, so a record cut off by a
+crash or power loss is found when the log is loaded and the log is truncated back to the last good record.
+
+Example:
+    store.set("coins", store.get("coins", 0) + 5)
+    rank = store.submit_score("arcade", "JON", 12000)   # None if it did not make the board
+    for name, score in store.get_scores("arcade"):
+        ...
+"""
+
+import atexit
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+SAVE_FOLDER = "saves"
+LOG_EXTENSION = ".log"
+RECORD_HEADER = struct.Struct("<II")   # length of the payload, crc32 of the payload
+BATCH_DELAY = 0.05   # Seconds the writer waits after a write so writes close together share one fsync
+COMPACT_MIN_SIZE = 64 * 1024   # The log is never compacted while it is smaller than this many bytes
+COMPACT_RATIO = 4   # The log is compacted once it is this many times the size of the live data
+LEADERBOARD_PREFIX = "leaderboard:"
+
+stores: dict[str, "Store"] = {}
+stores_lock = threading.Lock()
+
+
+class StorageError(Exception):
+    """Base class for errors in the storage module."""
+    pass
+
+
+def encode_record(operation: str, key: str, value=None) -> bytes:
+    payload = json.dumps([operation, key, value], separators=(",", ":")).encode("utf-8")
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class Store:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {}
+        self.lock = threading.Lock()   # Held while data is changed or copied
+        self.queue = queue.Queue()   # Encoded records waiting to be written, None tells the writer to stop
+        self.writer: threading.Thread = None
+        self.log_size = 0
+        self.live_size = 0   # Rough size of the records needed to rebuild data
+        self._load()
+        self.file = open(self.path, "ab")
+
+    def _load(self):
+        """Replays the log into data, truncating it at the first record that is cut off or corrupt."""
+        try:
+            with open(self.path, "rb") as file:
+                log = file.read()
+        except FileNotFoundError:
+            return
+
+        position = 0
+        while position + RECORD_HEADER.size <= len(log):
+            length, crc = RECORD_HEADER.unpack_from(log, position)
+            start = position + RECORD_HEADER.size
+            payload = log[start:start + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            try:
+                operation, key, value = json.loads(payload)
+            except ValueError:
+                break
+            if operation == "set":
+                self.data[key] = value
+            else:
+                self.data.pop(key, None)
+            position = start + length
+
+        if position != len(log):
+            with open(self.path, "r+b") as file:
+                file.truncate(position)
+        self.log_size = position
+        self.live_size = sum(len(encode_record("set", key, value)) for key, value in self.data.items())
+
+    def _queue(self, record: bytes):
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, name="StoreWriter", daemon=True)
+            self.writer.start()
+        self.queue.put(record)
+
+    def get(self, key: str, default=None):
+        """Returns the value saved for key. Values are shared, so copy lists and dicts before changing them."""
+        return self.data.get(key, default)
+
+    def set(self, key: str, value):
+        """Saves value (anything that can be turned into JSON) for key. Returns right away, the value is
+        written to disk in the background."""
+        record = encode_record("set", key, value)
+        with self.lock:
+            self.data[key] = value
+            self._queue(record)
+
+    def delete(self, key: str):
+        """Removes the value saved for key."""
+        with self.lock:
+            if key not in self.data:
+                return
+            del self.data[key]
+            self._queue(encode_record("del", key))
+
+    def keys(self):
+        return list(self.data)
+
+    def __contains__(self, key: str):
+        return key in self.data
+
+    def submit_score(self, board: str, name: str, score, keep: int = 10, higher_is_better: bool = True):
+        """Adds a score to a leaderboard that keeps the best keep scores. Returns the rank it got starting at 0,
+        or None if it was not good enough to be kept."""
+        entry = [name, score]
+        scores = list(self.get(LEADERBOARD_PREFIX + board, []))
+        scores.append(entry)
+        # sort is stable, so a new score that ties an old one goes after it
+        scores.sort(key=lambda e: e[1], reverse=higher_is_better)
+        scores = scores[:keep]
+        rank = next((i for i in range(len(scores)) if scores[i] is entry), None)
+        if rank is not None:
+            self.set(LEADERBOARD_PREFIX + board, scores)
+        return rank
+
+    def get_scores(self, board: str) -> list:
+        """Returns the (name, score) pairs of a leaderboard, best first."""
+        return [(name, score) for name, score in self.get(LEADERBOARD_PREFIX + board, [])]
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            time.sleep(BATCH_DELAY)
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            data = b"".join(record for record in batch if record is not None)
+            try:
+                if data:
+                    self.file.write(data)
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+                    self.log_size += len(data)
+                    if self.log_size > COMPACT_MIN_SIZE and self.log_size > COMPACT_RATIO * self.live_size:
+                        self._compact()
+            except OSError as e:
+                print("ERROR (storage): could not write " + self.path + ": " + str(e))
+            finally:
+                for record in batch:
+                    self.queue.task_done()
+
+            if None in batch:
+                return
+
+    def _compact(self):
+        """Runs on the writer thread. Replaces the log with one set record per live key. Records still in the
+        queue were already applied to the snapshot, but writing them again afterwards gives the same data."""
+        with self.lock:
+            snapshot = dict(self.data)
+        temp = self.path + ".tmp"
+        with open(temp, "wb") as file:
+            for key, value in snapshot.items():
+                file.write(encode_record("set", key, value))
+            file.flush()
+            os.fsync(file.fileno())
+            size = file.tell()
+
+        self.file.close()
+        os.replace(temp, self.path)
+        self.file = open(self.path, "ab")
+        sync_folder(os.path.dirname(self.path))
+        self.log_size = size
+        self.live_size = size
+
+    def flush(self):
+        """Waits until every change so far is on disk."""
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self):
+        """Writes everything still queued and closes the log."""
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+        self.file.close()
+
+
+def sync_folder(folder: str):
+    """Makes a rename inside folder survive a crash. Not possible on every platform, so errors are ignored."""
+    try:
+        descriptor = os.open(folder or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def open_store(name: str) -> Store:
+    """Returns the Store called name, loading it the first time."""
+    with stores_lock:
+        store = stores.get(name)
+        if store is None:
+            os.makedirs(SAVE_FOLDER, exist_ok=True)
+            store = Store(SAVE_FOLDER + "/" + name + LOG_EXTENSION)
+            stores[name] = store
+        return store
+
+
+def preload():
+    """Loads every saved store on a background thread so they are ready before a game asks for one."""
+    def load_all():
+        if not os.path.isdir(SAVE_FOLDER):
+            return
+        for entry in os.scandir(SAVE_FOLDER):
+            if entry.name.endswith(LOG_EXTENSION):
+                try:
+                    open_store(entry.name[:-len(LOG_EXTENSION)])
+                except Exception as e:
+                    print("ERROR (storage): could not load " + entry.path + ": " + str(e))
+
+    threading.Thread(target=load_all, name="StorePreload", daemon=True).start()
+
+
+def close_all():
+    """Writes everything still queued by every store and closes them."""
+    with stores_lock:
+        for store in stores.values():
+            store.close()
+        stores.clear()
+
+
+# The writer threads are daemons, so anything still queued would be lost if the launcher exits without
+# calling close_all (like after an error)
+atexit.register(close_all)
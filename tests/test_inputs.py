@@ -0,0 +1,80 @@
+"""Drives the controller backend in inputs with synthetic SDL joystick events under the dummy video driver.
+Run it from the root of the repo: python -m pytest tests"""
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+import graphics as g
+import inputs
+
+
+@pytest.fixture
+def win():
+    window = g.Window(64, 64)
+    inputs.win = window
+    inputs.kbm = False
+    inputs.use_controllers = True
+    inputs.controllers_initialized = False
+    inputs.pads.clear()
+    inputs.players[:] = [inputs.Player() for i in range(inputs.max_players)]
+    yield window
+    pygame.quit()
+
+
+def post(event_type, **attributes):
+    assert pygame.event.post(pygame.event.Event(event_type, **attributes))
+
+
+def next_frame(window):
+    window.update()
+    inputs.update()
+
+
+def test_synthetic_events_drive_players(win):
+    inputs.update()   # starts the joystick subsystem and allows its events
+
+    post(pygame.JOYDEVICEADDED, device_index=0, instance_id=7)
+    next_frame(win)
+    assert inputs.get_player_count() == 1
+    assert inputs.players[0].pad is inputs.pads[7]
+
+    post(pygame.JOYAXISMOTION, instance_id=7, axis=inputs.AXIS_X, value=1.0)
+    post(pygame.JOYBUTTONDOWN, instance_id=7, button=0)
+    next_frame(win)
+    assert inputs.get_joystick_magnitude() == pytest.approx(1.0)
+    assert inputs.get_joystick_angle() == pytest.approx(0.0)
+    assert inputs.isKeybindFirstPressed("button1")
+    assert inputs.isKeybindDown("button1")
+
+    # Inside the deadzone the stick counts as centered
+    post(pygame.JOYAXISMOTION, instance_id=7, axis=inputs.AXIS_X, value=inputs.deadzone / 2)
+    post(pygame.JOYBUTTONUP, instance_id=7, button=0)
+    next_frame(win)
+    assert inputs.get_joystick_magnitude() == 0
+    assert inputs.hasKeybindBeenPressed("button1")
+
+    post(pygame.JOYDEVICEREMOVED, instance_id=7)
+    next_frame(win)
+    assert inputs.players[0].pad is None
+    assert 7 not in inputs.pads
+
+
+def test_poll_passes_events_to_game_listeners(win):
+    inputs.update()
+    post(pygame.JOYDEVICEADDED, device_index=0, instance_id=3)
+    next_frame(win)
+
+    heard = []
+    win.addListener(pygame.JOYBUTTONDOWN, heard.append)
+    post(pygame.JOYBUTTONDOWN, instance_id=3, button=1)
+    inputs.poll()
+
+    assert [event.button for event in heard] == [1]
+    assert inputs.isKeybindDown("button2")
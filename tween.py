@@ -0,0 +1,267 @@
+"""Tweens animate a number from where it is to a new value over time with an easing curve. Every active tween
+of a Tweener lives in a set of NumPy arrays, so advancing all of them is one vectorized step per frame and
+only the final values are written back to the objects.
+
+Example:
+    tweener = tween.Tweener()
+    tweener.add(image, "x", 800, 0.5, "outCubic")
+    tweener.sequence(image, "y", [(200, 0.3, "outQuad"), (500, 0.3, "inQuad")], onComplete=print)
+    ...
+    tweener.update(frame_time)   # every frame in update()
+"""
+
+import math
+
+import numpy as np
+
+import graphics
+
+
+# Easing Curves
+# =================================================================================================
+"""Each curve takes an array of progress values from 0 to 1 and returns the eased values."""
+def _outBounce(t):
+    t = t * 1.0
+    result = np.empty_like(t)
+    a = t < 1 / 2.75
+    b = ~a & (t < 2 / 2.75)
+    c = ~a & ~b & (t < 2.5 / 2.75)
+    d = ~a & ~b & ~c
+    result[a] = 7.5625 * t[a] ** 2
+    result[b] = 7.5625 * (t[b] - 1.5 / 2.75) ** 2 + 0.75
+    result[c] = 7.5625 * (t[c] - 2.25 / 2.75) ** 2 + 0.9375
+    result[d] = 7.5625 * (t[d] - 2.625 / 2.75) ** 2 + 0.984375
+    return result
+
+
+EASINGS = {
+    "linear": lambda t: t,
+    "inQuad": lambda t: t * t,
+    "outQuad": lambda t: t * (2 - t),
+    "inOutQuad": lambda t: np.where(t < 0.5, 2 * t * t, 1 - (-2 * t + 2) ** 2 / 2),
+    "inCubic": lambda t: t ** 3,
+    "outCubic": lambda t: 1 - (1 - t) ** 3,
+    "inOutCubic": lambda t: np.where(t < 0.5, 4 * t ** 3, 1 - (-2 * t + 2) ** 3 / 2),
+    "inSine": lambda t: 1 - np.cos(t * math.pi / 2),
+    "outSine": lambda t: np.sin(t * math.pi / 2),
+    "inOutSine": lambda t: -(np.cos(math.pi * t) - 1) / 2,
+    "outBack": lambda t: 1 + 2.70158 * (t - 1) ** 3 + 1.70158 * (t - 1) ** 2,
+    "outBounce": _outBounce
+}
+EASING_NAMES = tuple(EASINGS)
+EASING_FUNCTIONS = tuple(EASINGS.values())
+
+# A tween id is the generation of its slot shifted left by SLOT_BITS, or'd with the slot
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+# Errors Messages to be used
+# =================================================================================================
+INVALID_EASING = "Easing must be one of: " + ", ".join(EASING_NAMES)
+INVALID_SETTER = "A tween without an attribute needs a function to call and a start value."
+
+
+# Helper Classes
+# =================================================================================================
+class TweenError(Exception):
+    """Base class for errors in the tween module."""
+    pass
+
+
+# Tween Classes
+# =================================================================================================
+class Tweener:
+
+    def __init__(self, capacity=32):
+        """Creates a Tweener with room for capacity tweens. It grows when more are added."""
+        graphics.invalidValueCheck(capacity)
+        self.capacity = 0
+        self.alive = None
+        self.started = None
+        self.hasStart = None   # True if the start value was given instead of read when the tween starts
+        self.start = None
+        self.end = None
+        self.elapsed = None   # Negative while waiting for the delay
+        self.duration = None
+        self.easing = None   # Index into EASING_NAMES
+        self.generation = None   # Goes up every time a slot is freed, so ids of old tweens stop matching it
+        self.used = 0   # Slots past this have never been used
+        self.freeSlots = []
+        self.targets = []   # (object, attribute name) or (function, None) per slot
+        self.callbacks = []   # Function called with the object when the tween finishes, or None
+        self.running = {}   # (id of object, attribute name) -> slot of the tween currently animating it
+        self._grow(int(capacity))
+
+    def _grow(self, capacity):
+        def grown(array, dtype):
+            new = np.zeros(capacity, dtype=dtype)
+            if array is not None:
+                new[:len(array)] = array
+            return new
+
+        self.alive = grown(self.alive, bool)
+        self.started = grown(self.started, bool)
+        self.hasStart = grown(self.hasStart, bool)
+        self.start = grown(self.start, np.float64)
+        self.end = grown(self.end, np.float64)
+        self.elapsed = grown(self.elapsed, np.float64)
+        self.duration = grown(self.duration, np.float64)
+        self.easing = grown(self.easing, np.int8)
+        self.generation = grown(self.generation, np.int64)
+        self.targets.extend([None] * (capacity - self.capacity))
+        self.callbacks.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def _newSlot(self):
+        if self.freeSlots:
+            return self.freeSlots.pop()
+        if self.used == self.capacity:
+            self._grow(self.capacity * 2)
+        self.used += 1
+        return self.used - 1
+
+    def add(self, obj, attribute, end, duration, easing="linear", delay=0.0, onComplete=None, start=None):
+        """Animates obj.attribute to end over duration seconds after waiting delay seconds. The start value is
+        read from the object when the tween starts unless start is given. If attribute is None then obj is a
+        function that is called with each new value and start is needed. Starting a tween stops any other
+        tween running on the same attribute. Returns the id of the tween."""
+        if easing not in EASINGS:
+            raise TweenError(INVALID_EASING)
+        if attribute is None and (not callable(obj) or start is None):
+            raise TweenError(INVALID_SETTER)
+        graphics.invalidValueCheck(duration, delay, zero=True)
+        slot = self._newSlot()
+        self.alive[slot] = True
+        self.started[slot] = False
+        self.hasStart[slot] = start is not None
+        self.start[slot] = 0.0 if start is None else start
+        self.end[slot] = end
+        self.elapsed[slot] = -delay
+        self.duration[slot] = duration
+        self.easing[slot] = EASING_NAMES.index(easing)
+        self.targets[slot] = (obj, attribute)
+        self.callbacks[slot] = onComplete
+        return (int(self.generation[slot]) << SLOT_BITS) | slot
+
+    def addFunction(self, setter, start, end, duration, easing="linear", delay=0.0, onComplete=None):
+        """Animates a value from start to end by calling setter with every new value."""
+        return self.add(setter, None, end, duration, easing, delay, onComplete, start)
+
+    def sequence(self, obj, attribute, steps, delay=0.0, onComplete=None):
+        """Runs tweens on the same attribute one after another. steps is a list of (end, duration, easing).
+        onComplete is called after the last step. Returns the ids of the tweens."""
+        slots = []
+        for i in range(len(steps)):
+            end, duration, easing = steps[i]
+            callback = onComplete if i == len(steps) - 1 else None
+            # Every step after the first starts exactly where the step before it ends
+            start = None if i == 0 else steps[i - 1][0]
+            slots.append(self.add(obj, attribute, end, duration, easing, delay, callback, start))
+            delay += duration
+        return slots
+
+    def _slotOf(self, tweenId):
+        """Returns the slot of a tween that has not finished yet, or None if it has. Slots are reused, so the
+        generation in the id has to match the slot's too."""
+        slot = tweenId & SLOT_MASK
+        if slot >= self.used or not self.alive[slot] or self.generation[slot] != tweenId >> SLOT_BITS:
+            return None
+        return slot
+
+    def cancel(self, tweenId):
+        """Stops a tween where it is without calling its onComplete."""
+        slot = self._slotOf(tweenId)
+        if slot is not None:
+            self._free(slot)
+
+    def cancelAll(self, obj=None, attribute=None):
+        """Stops every tween, or only the tweens on obj (and attribute if given)."""
+        for slot in np.flatnonzero(self.alive[:self.used]).tolist():
+            target, name = self.targets[slot]
+            if obj is None or (target is obj and (attribute is None or name == attribute)):
+                self._free(slot)
+
+    def isRunning(self, tweenId):
+        """Checks to see if a tween has not finished yet"""
+        return self._slotOf(tweenId) is not None
+
+    def count(self):
+        """Returns how many tweens have not finished yet"""
+        return int(np.count_nonzero(self.alive[:self.used]))
+
+    def _free(self, slot):
+        obj, attribute = self.targets[slot]
+        key = (id(obj), attribute)
+        if self.running.get(key) == slot:
+            del self.running[key]
+        self.alive[slot] = False
+        self.generation[slot] += 1
+        self.targets[slot] = None
+        self.callbacks[slot] = None
+        self.freeSlots.append(slot)
+
+    def _begin(self, slot):
+        """Reads the start value and takes over the attribute from any tween already running on it."""
+        obj, attribute = self.targets[slot]
+        key = (id(obj), attribute)
+        previous = self.running.get(key)
+        if previous is not None and previous != slot:
+            self._free(previous)
+        self.running[key] = slot
+        if not self.hasStart[slot]:
+            self.start[slot] = getattr(obj, attribute)
+        self.started[slot] = True
+
+    def _ease(self, progress, easing):
+        if np.all(easing == easing[0]):
+            return EASING_FUNCTIONS[easing[0]](progress)
+        eased = np.empty_like(progress)
+        for easingId in np.unique(easing).tolist():
+            match = easing == easingId
+            eased[match] = EASING_FUNCTIONS[easingId](progress[match])
+        return eased
+
+    def update(self, frameTime):
+        """Advances every tween by frameTime seconds and writes the new values to their objects."""
+        used = self.used
+        alive = self.alive[:used]
+        if not alive.any():
+            return
+        self.elapsed[:used] += frameTime * alive
+
+        for slot in np.flatnonzero(alive & ~self.started[:used] & (self.elapsed[:used] >= 0)).tolist():
+            self._begin(slot)
+        # _begin can stop tweens that were running, so look at alive again
+        running = np.flatnonzero(self.alive[:used] & self.started[:used])
+        if len(running) == 0:
+            return
+
+        progress = np.minimum(self.elapsed[running] / np.maximum(self.duration[running], 1e-9), 1.0)
+        start = self.start[running]
+        values = start + (self.end[running] - start) * self._ease(progress, self.easing[running])
+
+        # Setters and callbacks can cancel or add tweens, so a slot is only used while it has the same generation
+        generations = self.generation[running].tolist()
+        targets = self.targets
+        for slot, generation, value in zip(running.tolist(), generations, values.tolist()):
+            if not self.alive[slot] or self.generation[slot] != generation:
+                continue
+            obj, attribute = targets[slot]
+            if attribute is None:
+                obj(value)
+            else:
+                setattr(obj, attribute, value)
+                if isinstance(obj, graphics.GraphicsObject):
+                    obj.markChanged()
+
+        # Every finished tween is freed before any callback runs, so a callback that cancels or starts tweens
+        # never sees a slot that is half way through being freed
+        finished = []
+        for slot, generation, done in zip(running.tolist(), generations, (progress >= 1.0).tolist()):
+            if done and self.alive[slot] and self.generation[slot] == generation:
+                finished.append((self.targets[slot][0], self.callbacks[slot]))
+                self._free(slot)
+        for obj, callback in finished:
+            if callback is not None:
+                callback(obj)